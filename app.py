@@ -1,12 +1,23 @@
 """Streamlit dashboard for NIFTY / BANKNIFTY / FINNIFTY liquidity analysis."""
 
-import re
+import functools
+import hashlib
+import inspect
+import os
 import sqlite3
+import threading
+from datetime import date
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from src.persistence import PARQUET_COMPLETE_MARKER
+
 DB_PATH = "data/ticks.db"
+PARQUET_DIR = "data/parquet"
+DISK_CACHE_DIR = "data/cache/dashboard"
+DISK_CACHE_VERSION = 1  # bump when shared helpers (_shrink, load_session_ticks, ...) change output
 
 INSTRUMENTS = {
     "NIFTY": dict(lot=65, strike_gap=50, spot_sym="NIFTY 50", fut_prefix="NIFTY", opt_prefix="NIFTY"),
@@ -16,9 +27,161 @@ INSTRUMENTS = {
 
 MARKET_OPEN, MARKET_CLOSE = "09:15:00", "15:30:00"
 
+_DB_LOCK = threading.Lock()
+
+
+@st.cache_resource
+def _conn() -> sqlite3.Connection:
+    """One shared read connection per server process, tuned for analytic scans."""
+    c = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    c.executescript(
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA cache_size=-200000;"
+        "PRAGMA mmap_size=1073741824;"
+        "PRAGMA temp_store=MEMORY;"
+    )
+    return c
+
+
+@st.cache_resource
+def _duck():
+    """In-memory DuckDB exposing the Parquet export (scripts/export_parquet.py) as ticks/tick_depths views."""
+    try:
+        import duckdb
+    except ImportError:
+        return None
+    c = duckdb.connect(":memory:")
+    for table in ("ticks", "tick_depths"):
+        glob = os.path.join(PARQUET_DIR, table, "*", "*.parquet")
+        # Mirror the generated SQLite columns; they are not stored in the export.
+        extra = (
+            ", substr(exchange_timestamp, 12, 8) AS exchange_time"
+            # TRY_CAST: "" (no timestamp, e.g. LTP mode) gives NULL, as SQLite's strftime does
+            ", CAST(epoch(TRY_CAST(exchange_timestamp AS TIMESTAMP)) AS BIGINT) AS exchange_epoch"
+        ) if table == "ticks" else ""
+        c.execute(
+            f"CREATE VIEW {table} AS SELECT *{extra} FROM read_parquet('{glob}', "
+            "hive_partitioning = true, hive_types = {'trade_date': 'VARCHAR'})"
+        )
+    return c
+
+
+def _marker_path(table: str, trade_date: str) -> str:
+    return os.path.join(PARQUET_DIR, table, f"trade_date={trade_date}", PARQUET_COMPLETE_MARKER)
+
+
+def _has_parquet(trade_date: str) -> bool:
+    """True once export_parquet.py has marked the date complete; receiver part files alone
+    may hold only part of the day."""
+    return all(os.path.exists(_marker_path(table, trade_date)) for table in ("ticks", "tick_depths"))
+
 
-def get_conn():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+def _fetchall(q: str, params: tuple = ()) -> list:
+    with _DB_LOCK:
+        return _conn().execute(q, params).fetchall()
+
+
+def _read_sql(q: str, params: tuple = (), trade_date: str | None = None) -> pd.DataFrame:
+    """Run q against the Parquet export when trade_date has been exported, else SQLite.
+
+    Queries must stick to SQL both engines accept (no time()/strftime()).
+    """
+    if trade_date and _has_parquet(trade_date):
+        duck = _duck()
+        if duck is not None:
+            return duck.cursor().execute(q, list(params)).df()
+    with _DB_LOCK:
+        return pd.read_sql_query(q, _conn(), params=params)
+
+
+def _from_rollup(columns: str, symbols: list[str], trade_date: str) -> pd.DataFrame:
+    """Per-symbol session stats from daily_liquidity_summary (scripts/rollup.py).
+
+    Empty for the live day, or when the date has not been rolled up yet.
+    """
+    if trade_date >= date.today().isoformat():
+        return pd.DataFrame()
+    placeholders = ",".join("?" * len(symbols))
+    q = f"""
+    SELECT tradingsymbol, {columns} FROM daily_liquidity_summary
+    WHERE trade_date = ? AND tradingsymbol IN ({placeholders})
+    """
+    try:
+        return _read_sql(q, (trade_date, *symbols))
+    except pd.errors.DatabaseError:
+        # Table only exists once the receiver or rollup has initialised the DB
+        return pd.DataFrame()
+
+
+def _rollup_rows(trade_date: str) -> int:
+    try:
+        return _fetchall("SELECT COUNT(*) FROM daily_liquidity_summary WHERE trade_date = ?", (trade_date,))[0][0]
+    except sqlite3.Error:
+        return 0
+
+
+def disk_cache(func):
+    """Persist DataFrame results for exported trade dates as Parquet so they survive app restarts.
+
+    Sits under @st.cache_data: in-session hits stay in memory, cold starts read
+    the Parquet file instead of rescanning ticks. Only dates export_parquet.py has
+    marked complete are cached, keyed on the marker's mtime and the date's rollup
+    row count, so a re-export after a late flush or a later rollup.py run starts a
+    fresh entry; the live day and unexported days always run the query. The directory carries DISK_CACHE_VERSION and a hash of func's
+    source, so editing a loader never serves results from the old code.
+    """
+    sig = inspect.signature(func)
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = ""
+    cache_dir = os.path.join(
+        DISK_CACHE_DIR,
+        f"v{DISK_CACHE_VERSION}",
+        f"{func.__name__}-{hashlib.sha1(source.encode()).hexdigest()[:12]}",
+    )
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = sig.bind(*args, **kwargs)
+        trade_date = bound.arguments.get("trade_date")
+        if not trade_date or trade_date >= date.today().isoformat() or not _has_parquet(trade_date):
+            return func(*args, **kwargs)
+        try:
+            exported_at = os.stat(_marker_path("ticks", trade_date)).st_mtime_ns
+        except OSError:
+            return func(*args, **kwargs)
+        key = (sorted(bound.arguments.items()), exported_at, _rollup_rows(trade_date))
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        path = os.path.join(cache_dir, f"{digest}.parquet")
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+        df = func(*args, **kwargs)
+        if not df.empty:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                df.to_parquet(path + ".tmp", compression="zstd", index=False)
+                os.replace(path + ".tmp", path)
+            except (OSError, ValueError):
+                pass
+        return df
+
+    return wrapper
+
+
+def _shrink(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcast floats to float32, ints to the smallest int, tradingsymbol to category.
+
+    Call after any price arithmetic: float32 cannot resolve a 0.05 tick at index levels.
+    """
+    for c in df.select_dtypes("float64"):
+        df[c] = df[c].astype("float32")
+    for c in df.select_dtypes("int64"):
+        df[c] = pd.to_numeric(df[c], downcast="integer")
+    if "tradingsymbol" in df:
+        df["tradingsymbol"] = df["tradingsymbol"].astype("category")
+    return df
 
 
 # ── cached query helpers ────────────────────────────────────────────
@@ -26,168 +189,226 @@ def get_conn():
 
 @st.cache_data(ttl=300)
 def available_dates():
-    conn = get_conn()
-    rows = conn.execute(
+    rows = _fetchall(
         "SELECT DISTINCT trade_date FROM ticks WHERE trade_date > '2000-01-01' ORDER BY trade_date"
-    ).fetchall()
-    conn.close()
+    )
     return [r[0] for r in rows]
 
 
 @st.cache_data(ttl=300)
 def futures_symbols(prefix: str):
-    conn = get_conn()
-    rows = conn.execute(
+    rows = _fetchall(
         "SELECT DISTINCT tradingsymbol FROM ticks WHERE tradingsymbol LIKE ? ORDER BY tradingsymbol",
         (f"{prefix}%FUT",),
-    ).fetchall()
-    conn.close()
+    )
     return [r[0] for r in rows]
 
 
 @st.cache_data(ttl=300)
 def spot_last_price(spot_sym: str, trade_date: str) -> float | None:
-    conn = get_conn()
-    row = conn.execute(
-        "SELECT last_price FROM ticks WHERE tradingsymbol = ? AND trade_date = ? ORDER BY exchange_timestamp DESC LIMIT 1",
+    rows = _fetchall(
+        "SELECT last_price FROM ticks WHERE tradingsymbol = ? AND trade_date = ? ORDER BY exchange_time DESC LIMIT 1",
         (spot_sym, trade_date),
-    ).fetchone()
-    conn.close()
-    return row[0] if row else None
+    )
+    return rows[0][0] if rows else None
 
 
 @st.cache_data(ttl=300)
 def option_symbols_for_date(prefix: str, trade_date: str):
-    conn = get_conn()
     # Use prefix + 2-digit year to avoid matching spot symbols like "NIFTY 50" or "NIFTY BANK"
-    rows = conn.execute(
+    rows = _fetchall(
         "SELECT DISTINCT tradingsymbol FROM ticks WHERE tradingsymbol LIKE ? AND trade_date = ? AND (tradingsymbol LIKE '%CE' OR tradingsymbol LIKE '%PE')",
         (f"{prefix}26%", trade_date),
-    ).fetchall()
-    conn.close()
+    )
     return [r[0] for r in rows]
 
 
-_MONTHS = "JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC"
+_MONTHS = frozenset(("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"))
+
+
+@st.cache_data(ttl=300)
+def parse_option_symbols(syms: list[str], prefix: str) -> pd.DataFrame:
+    """Parse option symbols into columns symbol/strike/type/monthly, dropping unparseable ones.
 
-def parse_strike(sym: str, prefix: str) -> tuple[float, str] | None:
-    """Extract (strike, type) from e.g. NIFTY2621723100CE → (23100, 'CE')."""
-    # Monthly: PREFIX + YY + MON + STRIKE + CE/PE  (e.g. NIFTY26FEB23100CE)
-    m = re.match(rf"^{prefix}\d{{2}}(?:{_MONTHS})(\d+)(CE|PE)$", sym)
-    if m:
-        return float(m.group(1)), m.group(2)
-    # Weekly: PREFIX + YYMDD + STRIKE + CE/PE  (e.g. NIFTY2621723100CE — 5 date digits)
-    m = re.match(rf"^{prefix}\d{{5}}(\d+)(CE|PE)$", sym)
-    if m:
-        return float(m.group(1)), m.group(2)
-    return None
+    Monthly: PREFIX + YY + MON + STRIKE + CE/PE  (e.g. NIFTY26FEB23100CE)
+    Weekly:  PREFIX + YYMDD + STRIKE + CE/PE     (e.g. NIFTY2621723100CE — 5 date digits)
+    """
+    s = pd.Series(syms, dtype=object)
+    n = len(prefix)
+    kind = s.str[-2:]
+    mon = s.str[n + 2 : n + 5]
+    strike = s.str[n + 5 : -2]
+    monthly = mon.isin(_MONTHS)
+    valid = (
+        s.str.startswith(prefix)
+        & kind.isin(("CE", "PE"))
+        & s.str[n : n + 2].str.isdigit()
+        & (monthly | mon.str.isdigit())
+        & strike.str.isdigit()
+    ).astype(bool)
+    return pd.DataFrame({
+        "symbol": s[valid],
+        "strike": strike[valid].astype("float32"),
+        "type": kind[valid].astype(pd.CategoricalDtype(["CE", "PE"])),
+        "monthly": monthly[valid],
+    }).reset_index(drop=True)
 
 
 @st.cache_data(ttl=300)
+@disk_cache
 def load_futures_spread(symbol: str, trade_date: str) -> pd.DataFrame:
-    conn = get_conn()
     q = """
-    SELECT t.id, t.exchange_timestamp, t.last_price, t.total_buy_quantity, t.total_sell_quantity,
-           buy.price AS best_bid, buy.quantity AS bid_qty, buy.orders AS bid_orders,
-           sell.price AS best_ask, sell.quantity AS ask_qty, sell.orders AS ask_orders
+    SELECT t.id, t.exchange_epoch AS ts_s, t.last_price, t.total_buy_quantity, t.total_sell_quantity,
+           MAX(d.price)    FILTER (WHERE d.side = 'buy')  AS best_bid,
+           MAX(d.quantity) FILTER (WHERE d.side = 'buy')  AS bid_qty,
+           MAX(d.orders)   FILTER (WHERE d.side = 'buy')  AS bid_orders,
+           MAX(d.price)    FILTER (WHERE d.side = 'sell') AS best_ask,
+           MAX(d.quantity) FILTER (WHERE d.side = 'sell') AS ask_qty,
+           MAX(d.orders)   FILTER (WHERE d.side = 'sell') AS ask_orders
     FROM ticks t
-    JOIN tick_depths buy  ON buy.tick_id  = t.id AND buy.side  = 'buy'  AND buy.level = 0
-    JOIN tick_depths sell ON sell.tick_id  = t.id AND sell.side = 'sell' AND sell.level = 0
+    JOIN tick_depths d ON d.tick_id = t.id AND d.level = 0
     WHERE t.tradingsymbol = ? AND t.trade_date = ?
-      AND time(t.exchange_timestamp) BETWEEN ? AND ?
-    ORDER BY t.exchange_timestamp
+      AND t.exchange_time BETWEEN ? AND ?
+    GROUP BY t.id, t.exchange_epoch, t.last_price, t.total_buy_quantity, t.total_sell_quantity
+    HAVING COUNT(DISTINCT d.side) = 2
+    ORDER BY t.exchange_epoch
     """
-    df = pd.read_sql_query(q, conn, params=(symbol, trade_date, MARKET_OPEN, MARKET_CLOSE))
-    conn.close()
+    df = _read_sql(q, (symbol, trade_date, MARKET_OPEN, MARKET_CLOSE), trade_date)
     if df.empty:
         return df
-    df["exchange_timestamp"] = pd.to_datetime(df["exchange_timestamp"], format="ISO8601")
-    df["spread_pts"] = df["best_ask"] - df["best_bid"]
-    mid = (df["best_ask"] + df["best_bid"]) / 2
-    df["spread_bps"] = (df["spread_pts"] / mid) * 10000
-    df["ofi"] = df["total_buy_quantity"] - df["total_sell_quantity"]
-    return df
+    df["exchange_timestamp"] = pd.to_datetime(df["ts_s"], unit="s")
+    # Raw-array ufuncs with in-place outputs: one buffer per derived column, no temporaries
+    bid = df["best_bid"].to_numpy(np.float64)
+    ask = df["best_ask"].to_numpy(np.float64)
+    spread = np.subtract(ask, bid)
+    bps = np.add(ask, bid)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(spread, bps, out=bps)
+    bps *= 20000  # spread / ((ask + bid) / 2) * 10000
+    df["spread_pts"] = spread
+    df["spread_bps"] = bps
+    df["ofi"] = np.subtract(df["total_buy_quantity"].to_numpy(), df["total_sell_quantity"].to_numpy())
+    return _shrink(df)
 
 
 @st.cache_data(ttl=300)
+@disk_cache
 def load_option_spreads(symbols: list[str], trade_date: str) -> pd.DataFrame:
     if not symbols:
         return pd.DataFrame()
-    conn = get_conn()
+    df = _from_rollup("avg_spread, avg_spread_bps, total_volume", symbols, trade_date)
+    if not df.empty:
+        return _shrink(df.dropna(subset=["avg_spread"]))
     placeholders = ",".join("?" * len(symbols))
     q = f"""
-    SELECT t.tradingsymbol, AVG(sell.price - buy.price) AS avg_spread,
-           AVG((sell.price - buy.price) / NULLIF((sell.price + buy.price) / 2, 0)) * 10000 AS avg_spread_bps,
-           SUM(t.volume_traded) AS total_volume
-    FROM ticks t
-    JOIN tick_depths buy  ON buy.tick_id  = t.id AND buy.side  = 'buy'  AND buy.level = 0
-    JOIN tick_depths sell ON sell.tick_id  = t.id AND sell.side = 'sell' AND sell.level = 0
-    WHERE t.tradingsymbol IN ({placeholders}) AND t.trade_date = ?
-      AND time(t.exchange_timestamp) BETWEEN ? AND ?
-      AND buy.price > 0 AND sell.price > 0
-    GROUP BY t.tradingsymbol
+    WITH top AS (
+        SELECT t.tradingsymbol, t.volume_traded,
+               MAX(d.price) FILTER (WHERE d.side = 'buy')  AS bid,
+               MAX(d.price) FILTER (WHERE d.side = 'sell') AS ask
+        FROM ticks t
+        JOIN tick_depths d ON d.tick_id = t.id AND d.level = 0
+        WHERE t.tradingsymbol IN ({placeholders}) AND t.trade_date = ?
+          AND t.exchange_time BETWEEN ? AND ?
+        GROUP BY t.id, t.tradingsymbol, t.volume_traded
+    )
+    SELECT tradingsymbol, AVG(ask - bid) AS avg_spread,
+           AVG((ask - bid) / NULLIF((ask + bid) / 2, 0)) * 10000 AS avg_spread_bps,
+           SUM(volume_traded) AS total_volume
+    FROM top
+    WHERE bid > 0 AND ask > 0
+    GROUP BY tradingsymbol
     """
-    df = pd.read_sql_query(q, conn, params=(*symbols, trade_date, MARKET_OPEN, MARKET_CLOSE))
-    conn.close()
-    return df
+    df = _read_sql(q, (*symbols, trade_date, MARKET_OPEN, MARKET_CLOSE), trade_date)
+    return _shrink(df)
 
 
 @st.cache_data(ttl=300)
-def load_slippage_minute(fut_sym: str, ce_sym: str, pe_sym: str, trade_date: str) -> pd.DataFrame:
-    conn = get_conn()
-    q = """
-    SELECT strftime('%H:%M', t.exchange_timestamp) AS minute,
-           AVG(sell.price - buy.price) / 2 AS half_spread
+def load_session_ticks(symbols: tuple[str, ...], trade_date: str) -> pd.DataFrame:
+    """Per-tick top of book for a few symbols over the session; shared by Tabs 3 and 4.
+
+    Pass symbols sorted so both tabs hit the same cache entry.
+    """
+    placeholders = ",".join("?" * len(symbols))
+    q = f"""
+    SELECT t.tradingsymbol, substr(t.exchange_timestamp, 12, 5) AS minute, t.volume_traded,
+           MAX(d.price)    FILTER (WHERE d.side = 'buy')  AS bid,
+           MAX(d.price)    FILTER (WHERE d.side = 'sell') AS ask,
+           MAX(d.quantity) FILTER (WHERE d.side = 'buy')  AS bid_qty,
+           MAX(d.quantity) FILTER (WHERE d.side = 'sell') AS ask_qty,
+           MAX(d.orders)   FILTER (WHERE d.side = 'buy')  AS bid_orders,
+           MAX(d.orders)   FILTER (WHERE d.side = 'sell') AS ask_orders
     FROM ticks t
-    JOIN tick_depths buy  ON buy.tick_id  = t.id AND buy.side  = 'buy'  AND buy.level = 0
-    JOIN tick_depths sell ON sell.tick_id  = t.id AND sell.side = 'sell' AND sell.level = 0
-    WHERE t.tradingsymbol = ? AND t.trade_date = ?
-      AND time(t.exchange_timestamp) BETWEEN ? AND ?
-      AND buy.price > 0 AND sell.price > 0
-    GROUP BY minute ORDER BY minute
+    JOIN tick_depths d ON d.tick_id = t.id AND d.level = 0
+    WHERE t.tradingsymbol IN ({placeholders}) AND t.trade_date = ?
+      AND t.exchange_time BETWEEN ? AND ?
+    GROUP BY t.id, t.tradingsymbol, t.exchange_timestamp, t.volume_traded
     """
-    fut_df = pd.read_sql_query(q, conn, params=(fut_sym, trade_date, MARKET_OPEN, MARKET_CLOSE))
-    fut_df = fut_df.rename(columns={"half_spread": "fut_half_spread"})
+    return _read_sql(q, (*symbols, trade_date, MARKET_OPEN, MARKET_CLOSE), trade_date)
 
-    # Synthetic = avg of CE half-spread + PE half-spread
-    ce_df = pd.read_sql_query(q, conn, params=(ce_sym, trade_date, MARKET_OPEN, MARKET_CLOSE))
-    pe_df = pd.read_sql_query(q, conn, params=(pe_sym, trade_date, MARKET_OPEN, MARKET_CLOSE))
-    conn.close()
 
-    if ce_df.empty or pe_df.empty or fut_df.empty:
+@st.cache_data(ttl=300)
+@disk_cache
+def load_slippage_minute(fut_sym: str, ce_sym: str, pe_sym: str, trade_date: str) -> pd.DataFrame:
+    df = load_session_ticks(tuple(sorted((fut_sym, ce_sym, pe_sym))), trade_date)
+    df = df[(df["bid"] > 0) & (df["ask"] > 0)]
+    if df.empty:
         return pd.DataFrame()
 
-    merged = fut_df.merge(
-        ce_df.rename(columns={"half_spread": "ce_half_spread"}), on="minute", how="inner"
-    ).merge(
-        pe_df.rename(columns={"half_spread": "pe_half_spread"}), on="minute", how="inner"
-    )
-    merged["syn_half_spread"] = merged["ce_half_spread"] + merged["pe_half_spread"]
-    return merged
+    half_spread = ((df["ask"] - df["bid"]) / 2).rename("half_spread")
+    wide = half_spread.groupby([df["minute"], df["tradingsymbol"]]).mean().unstack("tradingsymbol")
+    columns = {fut_sym: "fut_half_spread", ce_sym: "ce_half_spread", pe_sym: "pe_half_spread"}
+    if not set(columns).issubset(wide.columns):
+        return pd.DataFrame()
+    # Inner alignment: keep only minutes where all three legs quoted
+    wide = wide[list(columns)].rename(columns=columns).dropna().sort_index()
+    wide.columns.name = None
+
+    # Synthetic = avg of CE half-spread + PE half-spread
+    wide["syn_half_spread"] = wide["ce_half_spread"] + wide["pe_half_spread"]
+    return _shrink(wide.reset_index())
 
 
 @st.cache_data(ttl=300)
+@disk_cache
 def load_depth_stats(symbols: list[str], trade_date: str) -> pd.DataFrame:
     if not symbols:
         return pd.DataFrame()
-    conn = get_conn()
-    placeholders = ",".join("?" * len(symbols))
-    q = f"""
-    SELECT t.tradingsymbol,
-           MAX(t.volume_traded) AS session_volume,
-           AVG(CASE WHEN d.side='buy'  AND d.level=0 THEN d.quantity END) AS avg_bid_qty,
-           AVG(CASE WHEN d.side='sell' AND d.level=0 THEN d.quantity END) AS avg_ask_qty,
-           AVG(CASE WHEN d.side='buy'  AND d.level=0 THEN d.orders END)  AS avg_bid_orders,
-           AVG(CASE WHEN d.side='sell' AND d.level=0 THEN d.orders END)  AS avg_ask_orders
-    FROM ticks t
-    JOIN tick_depths d ON d.tick_id = t.id
-    WHERE t.tradingsymbol IN ({placeholders}) AND t.trade_date = ?
-      AND time(t.exchange_timestamp) BETWEEN ? AND ?
-    GROUP BY t.tradingsymbol
+    df = _from_rollup(
+        "session_volume, avg_bid_qty, avg_ask_qty, avg_bid_orders, avg_ask_orders", symbols, trade_date
+    )
+    if not df.empty:
+        return _shrink(df)
+    df = load_session_ticks(tuple(sorted(symbols)), trade_date)
+    if df.empty:
+        return pd.DataFrame()
+    stats = df.groupby("tradingsymbol", sort=False).agg(
+        session_volume=("volume_traded", "max"),
+        avg_bid_qty=("bid_qty", "mean"),
+        avg_ask_qty=("ask_qty", "mean"),
+        avg_bid_orders=("bid_orders", "mean"),
+        avg_ask_orders=("ask_orders", "mean"),
+    )
+    return _shrink(stats.reset_index())
+
+
+def minute_means(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+    """Per-minute NaN-skipping means of cols keyed on df["ts_s"]; empty minutes are omitted.
+
+    Same result as resample("1min").mean() on the timestamp index, via bincount.
     """
-    df = pd.read_sql_query(q, conn, params=(*symbols, trade_date, MARKET_OPEN, MARKET_CLOSE))
-    conn.close()
-    return df
+    ts = df["ts_s"].to_numpy(np.int64)
+    t0 = ts.min() // 60 * 60
+    minute = (ts - t0) // 60
+    filled = np.bincount(minute) > 0
+    out = {}
+    for c in cols:
+        v = df[c].to_numpy(np.float64)
+        ok = ~np.isnan(v)
+        sums = np.bincount(minute, weights=np.where(ok, v, 0.0))[filled]
+        counts = np.bincount(minute, weights=ok)[filled]
+        out[c] = np.divide(sums, counts, out=np.full_like(sums, np.nan), where=counts > 0)
+    index = pd.to_datetime(t0 + np.flatnonzero(filled) * 60, unit="s")
+    return pd.DataFrame(out, index=index.rename("exchange_timestamp"))
 
 
 # ── UI ──────────────────────────────────────────────────────────────
@@ -223,19 +444,10 @@ else:
 # Option symbols
 all_opt_syms = option_symbols_for_date(cfg["opt_prefix"], trade_date)
 
-# Parse into structured list
-opt_parsed = []
-for s in all_opt_syms:
-    p = parse_strike(s, cfg["opt_prefix"])
-    if p:
-        opt_parsed.append({"symbol": s, "strike": p[0], "type": p[1]})
-opt_df = pd.DataFrame(opt_parsed) if opt_parsed else pd.DataFrame(columns=["symbol", "strike", "type"])
-
-# Identify weekly vs monthly
-# Weekly options: NIFTY26217... Monthly: NIFTY26FEB...
-monthly_pat = re.compile(rf"^{cfg['opt_prefix']}26(JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)")
-weekly_syms = [s for s in all_opt_syms if not monthly_pat.match(s)]
-monthly_syms = [s for s in all_opt_syms if monthly_pat.match(s)]
+# Parse into structured list; weekly options: NIFTY26217..., monthly: NIFTY26FEB...
+opt_df = parse_option_symbols(all_opt_syms, cfg["opt_prefix"])
+weekly_syms = opt_df.loc[~opt_df["monthly"], "symbol"].tolist()
+monthly_syms = opt_df.loc[opt_df["monthly"], "symbol"].tolist()
 
 # Auto-select: show weekly if available, otherwise monthly; let user toggle if both exist
 expiry_options = []
@@ -278,11 +490,7 @@ with tab1:
             col4.metric("Median Ask Qty", f"{df['ask_qty'].median():.0f}")
 
             # Resample to 1-min for smoother chart
-            df_m = df.set_index("exchange_timestamp").resample("1min").agg(
-                spread_pts=("spread_pts", "mean"),
-                spread_bps=("spread_bps", "mean"),
-                ofi=("ofi", "mean"),
-            ).dropna()
+            df_m = minute_means(df, ["spread_pts", "spread_bps", "ofi"]).dropna()
 
             st.line_chart(df_m["spread_pts"], y_label="Spread (pts)", use_container_width=True)
             st.line_chart(df_m["spread_bps"], y_label="Spread (bps)", use_container_width=True)
@@ -413,7 +621,9 @@ with tab4:
             stats["label"] = stats["tradingsymbol"].map(label_map)
             display = stats[["label", "session_volume", "avg_bid_qty", "avg_ask_qty", "avg_bid_orders", "avg_ask_orders"]].copy()
             display.columns = ["Symbol", "Session Volume", "Avg Bid Qty", "Avg Ask Qty", "Avg Bid Orders", "Avg Ask Orders"]
-            for col in display.columns[1:]:
-                display[col] = display[col].apply(lambda x: f"{x:,.0f}" if pd.notna(x) else "—")
             st.subheader("Depth & Volume Summary")
-            st.dataframe(display.set_index("Symbol"), use_container_width=True)
+            # Styler keeps the columns numeric (sortable) with the old 1,234 / "—" rendering
+            st.dataframe(
+                display.set_index("Symbol").style.format("{:,.0f}", na_rep="—"),
+                use_container_width=True,
+            )
@@ -16,23 +16,22 @@ import logging.handlers
 import os
 import signal
 import sys
+import threading
 import time
 from datetime import datetime
 from typing import Optional
+from zoneinfo import ZoneInfo
 
-import pytz
-import schedule
-import yaml
+# yaml, schedule and the src.* modules (kiteconnect, twisted, redis, pandas) are
+# imported where first needed so --help and scheduled idle time stay light.
 
-from src.auth import ZerodhaAuth, AuthenticationError
-from src.connector import MultiSocketConnector
-from src.instruments import InstrumentManager
-from src.notifier import TelegramNotifier
-from src.redis_publisher import RedisPublisher
-
-IST = pytz.timezone("Asia/Kolkata")
+IST = ZoneInfo("Asia/Kolkata")
 _connector = None
 _publisher = None
+_stop = threading.Event()  # ends the current session: market-close timer or every socket giving up
+_shutdown_requested = False  # set by the signal handler; a plain flag, never a lock
+
+MARKET_CLOSE_SHUTDOWN = (15, 45)
 
 
 def setup_logging(config: dict, log_level_override: Optional[str] = None) -> None:
@@ -51,8 +50,15 @@ def setup_logging(config: dict, log_level_override: Optional[str] = None) -> Non
 
 
 def load_config(path: str) -> dict:
+    import yaml
+
+    try:
+        from yaml import CSafeLoader as YamlLoader
+    except ImportError:  # PyYAML built without libyaml
+        from yaml import SafeLoader as YamlLoader
+
     with open(path, "r") as f:
-        config = yaml.safe_load(f)
+        config = yaml.load(f, Loader=YamlLoader)
     # Override config values from environment variables
     env_overrides = {
         "zerodha": {
@@ -75,19 +81,32 @@ def load_config(path: str) -> dict:
 
 
 def signal_handler(signum, frame):
-    global _connector, _publisher
-    if _connector:
-        _connector.stop()
-    if _publisher:
-        _publisher.close()
-    sys.exit(0)
+    # Event.set here could deadlock: the main thread may be inside _stop.wait holding
+    # the same lock. Raise KeyboardInterrupt in the main thread instead, once, and let
+    # run_trading_session's except/finally close sockets and Redis. A repeated signal
+    # only sets the flag, so it cannot cut that cleanup short.
+    global _shutdown_requested
+    if _shutdown_requested:
+        return
+    _shutdown_requested = True
+    raise KeyboardInterrupt
 
 
 def run_trading_session(symbols: list[str], config: dict) -> None:
+    from src.auth import ZerodhaAuth, AuthenticationError
+    from src.connector import MultiSocketConnector
+    from src.instruments import InstrumentManager
+    from src.notifier import TelegramNotifier
+    from src.redis_publisher import RedisPublisher
+
     global _connector, _publisher
     logger = logging.getLogger(__name__)
     notifier = TelegramNotifier.from_config(config)
     token_to_symbol = {}
+    timers: list[threading.Timer] = []
+    _stop.clear()
+    if _shutdown_requested:
+        return
 
     try:
         logger.info("STARTING TRADING SESSION FOR: %s", ", ".join(symbols))
@@ -119,43 +138,63 @@ def run_trading_session(symbols: list[str], config: dict) -> None:
             publisher=_publisher,
             config=config.get("connector", {}),
             token_to_symbol=token_to_symbol,
+            on_failure=_stop.set,  # called from a socket thread, never a signal handler
         )
         _connector.start(token_buckets)
         logger.info("Connector running. Ctrl+C to stop.")
 
-        market_open_sent = False
-        last_hourly_hour = None
         session_start = datetime.now(IST)
         WATCHDOG_TIMEOUT = 60  # seconds with no ticks before forcing reconnect
 
-        while True:
-            time.sleep(10)
+        def at(hour: int, minute: int) -> datetime:
+            return session_start.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+        def schedule_at(when: datetime, fn, *args) -> None:
+            delay = max((when - datetime.now(IST)).total_seconds(), 0)
+            timer = threading.Timer(delay, fn, args)
+            timer.daemon = True
+            timer.start()
+            timers.append(timer)
+
+        def send_hourly(hour: int) -> None:
+            notifier.send_hourly_stats(_connector.total_tick_count, hour - session_start.hour)
+
+        # Market-open notification at 9:15 (immediately if already past)
+        schedule_at(at(9, 15), notifier.send_market_open, len(token_to_symbol))
+        # Hourly stats on the hour (10:00, 11:00, ..., 15:00)
+        for hour in range(10, 16):
+            if at(hour, 0) > session_start:
+                schedule_at(at(hour, 0), send_hourly, hour)
+        close_dt = at(*MARKET_CLOSE_SHUTDOWN)
+        if close_dt > session_start:  # after-hours --login-now sessions run until signalled
+            schedule_at(close_dt, _stop.set)
+
+        # Watchdog: force reconnect if no ticks during market hours. Wakes only when a
+        # stall could first be detected rather than on a fixed poll.
+        market_open, market_end = at(9, 15), at(15, 31)
+        timeout = 0
+        while not _stop.wait(timeout):
             now = datetime.now(IST)
             logger.info("ticks=%d connected=%s", _connector.total_tick_count, _connector.all_connected)
-
-            # Send market-open notification once after 9:15
-            if not market_open_sent and now.hour >= 9 and now.minute >= 15:
-                notifier.send_market_open(len(token_to_symbol))
-                market_open_sent = True
-
-            # Send hourly stats on the hour (10:00, 11:00, ..., 15:00)
-            if now.hour >= 10 and now.minute < 1 and last_hourly_hour != now.hour:
-                elapsed = now.hour - session_start.hour
-                notifier.send_hourly_stats(_connector.total_tick_count, elapsed)
-                last_hourly_hour = now.hour
-
-            # Watchdog: force reconnect if no ticks during market hours
-            is_market_hours = (9, 15) <= (now.hour, now.minute) <= (15, 30)
-            stale_secs = time.time() - _connector.last_tick_time
-            if is_market_hours and stale_secs > WATCHDOG_TIMEOUT:
-                logger.warning("No ticks for %.0fs — forcing reconnect", stale_secs)
-                notifier.send_error(f"Feed stall detected ({stale_secs:.0f}s), reconnecting...")
-                _connector.reconnect_all(token_buckets)
-
-            # Shutdown after 15:45
-            if now.hour >= 15 and now.minute >= 45:
-                logger.info("Market closed. Shutting down.")
-                break
+            if now < market_open:
+                timeout = (market_open - now).total_seconds()
+            elif now < market_end:
+                # Quiet pre-open time does not count towards a stall
+                stale_secs = time.time() - max(_connector.last_tick_time, market_open.timestamp())
+                if stale_secs > WATCHDOG_TIMEOUT:
+                    logger.warning("No ticks for %.0fs — forcing reconnect", stale_secs)
+                    notifier.send_error(f"Feed stall detected ({stale_secs:.0f}s), reconnecting...")
+                    _connector.reconnect_all(token_buckets)
+                    stale_secs = 0
+                timeout = WATCHDOG_TIMEOUT - stale_secs + 1
+            else:
+                timeout = None
+
+        if _connector.failed:
+            logger.error("All sockets exhausted their reconnects. Ending session.")
+            notifier.send_error("All WebSocket connections gave up reconnecting; session ended.")
+        else:
+            logger.info("Market closed. Shutting down.")
 
     except AuthenticationError as e:
         logger.error("Auth failed: %s", e)
@@ -163,6 +202,8 @@ def run_trading_session(symbols: list[str], config: dict) -> None:
     except KeyboardInterrupt:
         pass
     finally:
+        for timer in timers:
+            timer.cancel()
         total_ticks = _connector.total_tick_count if _connector else 0
         symbol_count = len(token_to_symbol)
         if _connector:
@@ -171,6 +212,7 @@ def run_trading_session(symbols: list[str], config: dict) -> None:
             _publisher.close()
         if total_ticks > 0:
             notifier.send_session_end(total_ticks, symbol_count)
+        notifier.close()
         logger.info("Trading session ended")
 
 
@@ -200,15 +242,23 @@ def main():
         logger.error("No valid symbols provided")
         sys.exit(1)
 
-    if args.login_now:
-        run_trading_session(symbols, config)
-    else:
-        login_time = config.get("connector", {}).get("login_time", "08:50")
-        schedule.every().day.at(login_time).do(run_trading_session, symbols=symbols, config=config)
-        logger.info("Scheduled daily login at %s IST for %s", login_time, ", ".join(symbols))
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+    try:
+        if args.login_now:
+            run_trading_session(symbols, config)
+        else:
+            import schedule
+
+            login_time = config.get("connector", {}).get("login_time", "08:50")
+            schedule.every().day.at(login_time).do(run_trading_session, symbols=symbols, config=config)
+            logger.info("Scheduled daily login at %s IST for %s", login_time, ", ".join(symbols))
+            while not _shutdown_requested:
+                schedule.run_pending()
+                # Sleep until the next job is due (capped so clock changes are picked up)
+                idle = schedule.idle_seconds()
+                time.sleep(60 if idle is None else min(max(idle, 0), 60))
+    except KeyboardInterrupt:
+        # Signal outside a session (or before its try block); nothing is open yet
+        logger.info("Shutting down")
 
 
 if __name__ == "__main__":
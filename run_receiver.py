@@ -6,12 +6,14 @@ stores in Redis, periodically persists to SQLite. Run as separate process.
 Usage:
   python run_receiver.py
   python run_receiver.py --config my_config.yaml
+  python run_receiver.py --consumers 4     # 4 processes in the consumer group
   python run_receiver.py --debug
 """
 
 import argparse
 import logging
 import logging.handlers
+import multiprocessing
 import os
 import signal
 import sys
@@ -19,9 +21,15 @@ from typing import Optional
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as YamlLoader
+
 from src.receiver import TickReceiver
 
 _receiver = None
+_workers: list = []
 
 
 def setup_logging(config: dict, log_level_override: Optional[str] = None) -> None:
@@ -41,7 +49,7 @@ def setup_logging(config: dict, log_level_override: Optional[str] = None) -> Non
 
 def load_config(path: str) -> dict:
     with open(path, "r") as f:
-        config = yaml.safe_load(f)
+        config = yaml.load(f, Loader=YamlLoader)
     # Override Redis host from environment variable
     redis_host = os.environ.get("REDIS_HOST")
     if redis_host:
@@ -50,31 +58,29 @@ def load_config(path: str) -> dict:
 
 
 def signal_handler(signum, frame):
-    global _receiver
+    # Only flag the consume loop to exit; run_receiver()'s finally block stops the receiver once.
     if _receiver:
-        _receiver.stop()
-    sys.exit(0)
+        _receiver.request_stop()
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Redis Tick Receiver")
-    parser.add_argument("--config", default="config.yaml")
-    parser.add_argument("--consumer-name", default=None)
-    parser.add_argument("--debug", action="store_true")
-    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default=None)
-    args = parser.parse_args()
+def stop_workers(signum, frame):
+    # --consumers parent: pass SIGTERM on; Ctrl+C already reaches the whole process group
+    for worker in _workers:
+        if worker.is_alive():
+            worker.terminate()
 
-    config = load_config(args.config)
-    log_override = args.log_level or ("DEBUG" if args.debug else None)
+
+def run_receiver(config: dict, redis_config: dict, log_override: Optional[str], log_suffix: str = "") -> None:
+    """Run one receiver until stopped. log_suffix gives each --consumers process its own log file."""
+    if log_suffix:
+        root, ext = os.path.splitext(config.get("logging", {}).get("log_file", "./logs/app.log"))
+        config.setdefault("logging", {})["log_file"] = f"{root}{log_suffix}{ext}"
     setup_logging(config, log_level_override=log_override)
     logger = logging.getLogger(__name__)
 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
-    redis_config = config.get("redis", {})
-    if args.consumer_name:
-        redis_config["consumer_name"] = args.consumer_name
     persistence_config = config.get("persistence", {})
 
     global _receiver
@@ -93,5 +99,45 @@ def main():
         logger.info("Receiver shut down")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Redis Tick Receiver")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--consumer-name", default=None)
+    parser.add_argument("--consumers", type=int, default=1,
+                        help="Receiver processes to run, named <consumer_name>-<n> in the group")
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default=None)
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    log_override = args.log_level or ("DEBUG" if args.debug else None)
+
+    redis_config = config.get("redis", {})
+    if args.consumer_name:
+        redis_config["consumer_name"] = args.consumer_name
+
+    if args.consumers <= 1:
+        run_receiver(config, redis_config, log_override)
+        return
+
+    # One process per consumer: decoding is CPU-bound, so threads would share one core.
+    # The group hands each entry to a single consumer; persist_ticks is safe with
+    # several writers on one DB.
+    base_name = redis_config.get("consumer_name", "receiver_1")
+    for i in range(1, args.consumers + 1):
+        worker_config = dict(redis_config, consumer_name=f"{base_name}-{i}")
+        _workers.append(multiprocessing.Process(
+            target=run_receiver,
+            args=(config, worker_config, log_override, f"-{i}"),
+            name=f"receiver-{i}",
+        ))
+    for worker in _workers:
+        worker.start()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, stop_workers)
+    for worker in _workers:
+        worker.join()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Export closed trading days from SQLite to a Parquet columnar store that the
+dashboard queries through DuckDB. Run nightly after the receiver has flushed.
+
+Layout (hive-partitioned by trade_date):
+  {parquet_dir}/ticks/trade_date=YYYY-MM-DD/part.parquet
+  {parquet_dir}/tick_depths/trade_date=YYYY-MM-DD/part.parquet
+
+With persistence.parquet_enabled the receiver also writes part-<id>.parquet
+files into the same partitions as it goes. Those may cover only part of a day, so
+every closed day is still exported here: the partition is replaced and marked
+complete with a _SUCCESS file, which the dashboard and this script's skip check
+look for.
+
+Usage:
+  python scripts/export_parquet.py                     # all closed days not yet marked complete
+  python scripts/export_parquet.py --date 2026-02-17   # one day (replaces the partition)
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.persistence import (
+    PARQUET_COMPLETE_MARKER,
+    PARQUET_DICTIONARY_COLUMNS,
+    PARQUET_TYPES,
+    parquet_schema,
+)
+
+logger = logging.getLogger("export_parquet")
+
+ROW_GROUP_SIZE = 200_000
+
+
+def load_config(path: str) -> dict:
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def _partition(parquet_dir: str, table_name: str, trade_date: str) -> str:
+    return os.path.join(parquet_dir, table_name, f"trade_date={trade_date}")
+
+
+def _write(df: pd.DataFrame, parquet_dir: str, table_name: str, trade_date: str) -> None:
+    partition = _partition(parquet_dir, table_name, trade_date)
+    os.makedirs(partition, exist_ok=True)
+    # Unmark first so the partition reads as incomplete until export_date finishes
+    marker = os.path.join(partition, PARQUET_COMPLETE_MARKER)
+    if os.path.exists(marker):
+        os.remove(marker)
+    # Replace whatever is there, including part-<id> files from the receiver's sink
+    for name in os.listdir(partition):
+        if name.endswith(".parquet"):
+            os.remove(os.path.join(partition, name))
+    table = pa.Table.from_pandas(
+        df[list(PARQUET_TYPES[table_name])], schema=parquet_schema(table_name), preserve_index=False
+    )
+    path = os.path.join(partition, "part.parquet")
+    tmp = path + ".tmp"
+    pq.write_table(
+        table,
+        tmp,
+        compression="zstd",
+        use_dictionary=PARQUET_DICTIONARY_COLUMNS[table_name],
+        row_group_size=ROW_GROUP_SIZE,
+    )
+    os.replace(tmp, path)
+
+
+def export_date(conn: sqlite3.Connection, parquet_dir: str, trade_date: str) -> int:
+    """Write one trade_date partition for ticks and tick_depths. Returns tick rows written."""
+    ticks = pd.read_sql_query(
+        "SELECT * FROM ticks WHERE trade_date = ? ORDER BY tradingsymbol, exchange_timestamp",
+        conn,
+        params=(trade_date,),
+    )
+    if ticks.empty:
+        return 0
+    depths = pd.read_sql_query(
+        """
+        SELECT d.* FROM tick_depths d
+        JOIN ticks t ON t.id = d.tick_id
+        WHERE t.trade_date = ?
+        ORDER BY d.tick_id, d.side, d.level
+        """,
+        conn,
+        params=(trade_date,),
+    )
+    _write(depths, parquet_dir, "tick_depths", trade_date)
+    _write(ticks, parquet_dir, "ticks", trade_date)
+    # Mark both complete only now; the dashboard switches to Parquet on these markers
+    for table_name in ("tick_depths", "ticks"):
+        open(os.path.join(_partition(parquet_dir, table_name, trade_date), PARQUET_COMPLETE_MARKER), "w").close()
+    return len(ticks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export SQLite ticks to Parquet")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--date", default=None, help="Export only this trade_date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)-8s | %(message)s")
+    persistence = load_config(args.config).get("persistence", {})
+    db_path = persistence.get("db_path", "./data/ticks.db")
+    parquet_dir = persistence.get("parquet_dir", "./data/parquet")
+
+    if not os.path.exists(db_path):
+        logger.error("Database not found at %s", db_path)
+        sys.exit(1)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        if args.date:
+            dates = [args.date]
+        else:
+            today = date.today().isoformat()
+            rows = conn.execute(
+                "SELECT DISTINCT trade_date FROM ticks WHERE trade_date > '2000-01-01' AND trade_date < ?",
+                (today,),
+            ).fetchall()
+            dates = [
+                r[0] for r in rows
+                if not os.path.exists(os.path.join(_partition(parquet_dir, "ticks", r[0]), PARQUET_COMPLETE_MARKER))
+            ]
+        for trade_date in dates:
+            n = export_date(conn, parquet_dir, trade_date)
+            logger.info("Exported %s: %d ticks", trade_date, n)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
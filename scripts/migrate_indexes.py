@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Bring an existing tick database up to the current schema (indexes included),
+refresh planner statistics, and print the query plans the dashboard relies on.
+
+Usage:
+  python scripts/migrate_indexes.py
+  python scripts/migrate_indexes.py --config my_config.yaml
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.persistence import TickPersistence
+
+logger = logging.getLogger("migrate_indexes")
+
+# Representative shapes of the dashboard's tick + top-of-book reads.
+PLAN_QUERIES = {
+    "ticks by symbol/date": """
+        SELECT t.id, t.exchange_timestamp, t.last_price
+        FROM ticks t
+        WHERE t.tradingsymbol = ? AND t.trade_date = ?
+          AND t.exchange_time BETWEEN ? AND ?
+    """,
+    "top of book join": """
+        SELECT d.side, d.price, d.quantity, d.orders
+        FROM ticks t
+        JOIN tick_depths d ON d.tick_id = t.id AND d.level = 0
+        WHERE t.tradingsymbol = ? AND t.trade_date = ?
+    """,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply tick DB indexes and ANALYZE")
+    parser.add_argument("--config", default="config.yaml")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)-8s | %(message)s")
+    with open(args.config, "r") as f:
+        persistence_config = yaml.safe_load(f).get("persistence", {})
+
+    persistence = TickPersistence(persistence_config)
+    persistence.initialize_db()
+    conn = persistence._conn
+    try:
+        logger.info("Running ANALYZE on %s", persistence.db_path)
+        conn.execute("ANALYZE")
+        conn.commit()
+        for name, q in PLAN_QUERIES.items():
+            params = ("X",) * q.count("?")
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {q}", params).fetchall()
+            logger.info("Plan for %s:", name)
+            for row in plan:
+                logger.info("  %s", row[-1])
+    finally:
+        persistence.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Roll closed trading days up into daily_liquidity_summary: one row per
+(trade_date, tradingsymbol) with the session averages the dashboard's
+option-spread and depth tabs would otherwise recompute from raw ticks.
+Run nightly after the receiver has flushed.
+
+Usage:
+  python scripts/rollup.py                     # all closed days not yet rolled up
+  python scripts/rollup.py --date 2026-02-17   # one day (replaces existing rows)
+"""
+
+import argparse
+import logging
+import os
+import sys
+from datetime import date
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.persistence import TickPersistence
+
+logger = logging.getLogger("rollup")
+
+# Same session window as the dashboard (app.py MARKET_OPEN / MARKET_CLOSE)
+MARKET_OPEN, MARKET_CLOSE = "09:15:00", "15:30:00"
+
+ROLLUP_SQL = """
+WITH top AS (
+    SELECT t.tradingsymbol, t.volume_traded,
+           MAX(d.price)    FILTER (WHERE d.side = 'buy')  AS bid,
+           MAX(d.price)    FILTER (WHERE d.side = 'sell') AS ask,
+           MAX(d.quantity) FILTER (WHERE d.side = 'buy')  AS bid_qty,
+           MAX(d.quantity) FILTER (WHERE d.side = 'sell') AS ask_qty,
+           MAX(d.orders)   FILTER (WHERE d.side = 'buy')  AS bid_orders,
+           MAX(d.orders)   FILTER (WHERE d.side = 'sell') AS ask_orders
+    FROM ticks t
+    JOIN tick_depths d ON d.tick_id = t.id AND d.level = 0
+    WHERE t.trade_date = ? AND t.exchange_time BETWEEN ? AND ?
+    GROUP BY t.id, t.tradingsymbol, t.volume_traded
+)
+INSERT OR REPLACE INTO daily_liquidity_summary
+SELECT ?, tradingsymbol,
+       AVG(ask - bid) FILTER (WHERE bid > 0 AND ask > 0),
+       AVG((ask - bid) / NULLIF((ask + bid) / 2, 0)) FILTER (WHERE bid > 0 AND ask > 0) * 10000,
+       SUM(volume_traded) FILTER (WHERE bid > 0 AND ask > 0),
+       MAX(volume_traded),
+       AVG(bid_qty), AVG(ask_qty), AVG(bid_orders), AVG(ask_orders)
+FROM top
+GROUP BY tradingsymbol
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build daily_liquidity_summary")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--date", default=None, help="Roll up only this trade_date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)-8s | %(message)s")
+    with open(args.config, "r") as f:
+        persistence_config = yaml.safe_load(f).get("persistence", {})
+
+    persistence = TickPersistence(persistence_config)
+    persistence.initialize_db()
+    conn = persistence._conn
+    try:
+        if args.date:
+            dates = [args.date]
+        else:
+            rows = conn.execute(
+                """
+                SELECT DISTINCT trade_date FROM ticks
+                WHERE trade_date > '2000-01-01' AND trade_date < ?
+                  AND trade_date NOT IN (SELECT DISTINCT trade_date FROM daily_liquidity_summary)
+                """,
+                (date.today().isoformat(),),
+            ).fetchall()
+            dates = [r[0] for r in rows]
+        for trade_date in dates:
+            conn.execute(ROLLUP_SQL, (trade_date, MARKET_OPEN, MARKET_CLOSE, trade_date))
+            conn.commit()
+            (n,) = conn.execute(
+                "SELECT COUNT(*) FROM daily_liquidity_summary WHERE trade_date = ?", (trade_date,)
+            ).fetchone()
+            logger.info("Rolled up %s: %d symbols", trade_date, n)
+    finally:
+        persistence.close()
+
+
+if __name__ == "__main__":
+    main()
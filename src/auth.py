@@ -30,6 +30,18 @@ BROWSER_HEADERS = {
     "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Upgrade-Insecure-Requests": "1",
 }
+REDIRECT_HEADERS = {**BROWSER_HEADERS, "Referer": "https://kite.zerodha.com/"}
+
+# Fallbacks for pulling request_token out of a non-JSON (HTML/JS) response body
+_TOKEN_PATTERNS = [
+    re.compile(p)
+    for p in (
+        r"request_token=([A-Za-z0-9_.-]+)",
+        r'"request_token"\s*:\s*"([^"]+)"',
+        r"'request_token'\s*:\s*'([^']+)'",
+        r"request_token[\"']?\s*[:=]\s*[\"']([^\"']+)[\"']",
+    )
+]
 
 
 class ZerodhaAuth:
@@ -170,13 +182,7 @@ class ZerodhaAuth:
         url = f"{KITE_CONNECT_URL}?v=3&api_key={self.api_key}"
         logger.debug("GET connect URL (same session for cookies): %s", url)
 
-        old_headers = dict(self._session.headers)
-        try:
-            self._session.headers.update(BROWSER_HEADERS)
-            resp = self._session.get(url, allow_redirects=False)
-        finally:
-            self._session.headers.clear()
-            self._session.headers.update(old_headers)
+        resp = self._session.get(url, headers=BROWSER_HEADERS, allow_redirects=False)
         redirect_url = resp.headers.get("Location", "")
         logger.debug("Connect response status=%s Location=%s", resp.status_code, redirect_url[:100] if redirect_url else "")
 
@@ -197,14 +203,7 @@ class ZerodhaAuth:
                 raise AuthenticationError("Redirect chain ended with no Location header and no request_token in body")
 
             logger.debug("Following redirect to: %s", redirect_url[:100])
-            self._session.headers.update(BROWSER_HEADERS)
-            self._session.headers["Referer"] = "https://kite.zerodha.com/"
-            try:
-                resp = self._session.get(redirect_url, allow_redirects=False)
-            finally:
-                for k in BROWSER_HEADERS:
-                    self._session.headers.pop(k, None)
-                self._session.headers.pop("Referer", None)
+            resp = self._session.get(redirect_url, headers=REDIRECT_HEADERS, allow_redirects=False)
             redirect_url = resp.headers.get("Location", "")
             logger.debug("Next response status=%s Location=%s", resp.status_code, redirect_url[:100] if redirect_url else "")
 
@@ -217,23 +216,18 @@ class ZerodhaAuth:
         text = resp.text or ""
         if not text.strip():
             return None
-        try:
-            data = json.loads(text)
-            if isinstance(data, dict) and "request_token" in data:
-                return data["request_token"]
-            if isinstance(data, dict) and "data" in data and isinstance(data["data"], dict):
-                if "request_token" in data["data"]:
-                    return data["data"]["request_token"]
-        except (json.JSONDecodeError, TypeError):
-            pass
-        patterns = [
-            r"request_token=([A-Za-z0-9_.-]+)",
-            r'"request_token"\s*:\s*"([^"]+)"',
-            r"'request_token'\s*:\s*'([^']+)'",
-            r"request_token[\"']?\s*[:=]\s*[\"']([^\"']+)[\"']",
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, text)
+        if text.lstrip()[:1] in ("{", "["):
+            try:
+                data = json.loads(text)
+                if isinstance(data, dict) and "request_token" in data:
+                    return data["request_token"]
+                if isinstance(data, dict) and "data" in data and isinstance(data["data"], dict):
+                    if "request_token" in data["data"]:
+                        return data["data"]["request_token"]
+            except (json.JSONDecodeError, TypeError):
+                pass
+        for pattern in _TOKEN_PATTERNS:
+            match = pattern.search(text)
             if match:
                 token = match.group(1).strip()
                 if len(token) >= 10:
@@ -4,9 +4,11 @@ distributes subscriptions, forwards ticks to Redis stream (non-blocking).
 """
 
 import logging
+import queue
 import threading
 import time
-from typing import Optional
+from itertools import chain
+from typing import Callable, Optional
 
 # Twisted (used by KiteTicker) installs signal handlers when the reactor runs.
 # We run each WebSocket in a daemon thread, so signal.signal() would raise
@@ -45,6 +47,7 @@ logger = logging.getLogger(__name__)
 
 MODE_LTP, MODE_QUOTE, MODE_FULL = "ltp", "quote", "full"
 MODE_MAP = {"ltp": MODE_LTP, "quote": MODE_QUOTE, "full": MODE_FULL}
+PUBLISH_COALESCE = 32  # max queued callbacks merged into one Redis pipeline
 
 
 class SocketConnection:
@@ -52,14 +55,24 @@ class SocketConnection:
 
     def __init__(self, socket_id: int, api_key: str, access_token: str, tokens: list,
                  tick_mode: str, publisher: RedisPublisher, token_to_symbol: dict,
-                 reconnect_max_retries: int = 50, reconnect_max_delay: int = 60):
+                 reconnect_max_retries: int = 50, reconnect_max_delay: int = 60,
+                 count_ticks: Optional[Callable[[int], None]] = None,
+                 on_give_up: Optional[Callable[["SocketConnection"], None]] = None):
         self.socket_id = socket_id
         self.tokens = tokens
         self.tick_mode = MODE_MAP.get(tick_mode, MODE_FULL)
         self.publisher = publisher
         self.token_to_symbol = token_to_symbol
+        # Flat lookups for the tick callback; avoids per-tick info dict .get() chains
+        self._sym = {tok: info.get("tradingsymbol", f"TOKEN_{tok}") for tok, info in token_to_symbol.items()}
+        self._name = {tok: info["name"] for tok, info in token_to_symbol.items() if "name" in info}
         self._tick_count = 0
+        self._count_ticks = count_ticks
+        self._on_give_up = on_give_up
         self._connected = False
+        # WS callback only enqueues; a per-socket thread does the Redis I/O
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._publisher_thread: Optional[threading.Thread] = None
         self._last_tick_time: float = time.time()
 
         self.kws = KiteTicker(
@@ -74,22 +87,51 @@ class SocketConnection:
         self.kws.on_close = self._on_close
         self.kws.on_error = self._on_error
         self.kws.on_reconnect = lambda ws, n: logger.info("Socket %d reconnecting attempt %d", self.socket_id, n)
-        self.kws.on_noreconnect = lambda ws: logger.critical("Socket %d max reconnects exhausted", self.socket_id)
+        self.kws.on_noreconnect = self._on_noreconnect
         self.kws.on_order_update = lambda ws, data: None
 
     def _on_ticks(self, ws, ticks: list) -> None:
-        self._tick_count += len(ticks)
+        if not ticks:
+            return
+        n = len(ticks)
+        self._tick_count += n
+        if self._count_ticks is not None:
+            self._count_ticks(n)
         self._last_tick_time = time.time()
-        try:
-            for tick in ticks:
-                token = tick.get("instrument_token")
-                info = self.token_to_symbol.get(token, {})
-                tick["tradingsymbol"] = info.get("tradingsymbol", f"TOKEN_{token}" if token else "UNKNOWN")
-                if "name" in info:
-                    tick["name"] = info["name"]
-            self.publisher.publish_ticks(ticks)
-        except Exception as e:
-            logger.error("Socket %d publish error: %s", self.socket_id, e)
+        self._queue.put(ticks)
+
+    def _publish_loop(self) -> None:
+        """Drain queued callbacks, coalescing up to PUBLISH_COALESCE into one publish. None stops."""
+        q, get_nowait = self._queue, self._queue.get_nowait
+        sym, nm = self._sym, self._name
+        publish = self.publisher.publish_ticks
+        while True:
+            batches = [q.get()]
+            while batches[-1] is not None and len(batches) < PUBLISH_COALESCE:
+                try:
+                    batches.append(get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batches[-1] is None
+            if stopping:
+                batches.pop()
+            if batches:
+                try:
+                    ticks = list(chain.from_iterable(batches))
+                    for tick in ticks:
+                        token = tick.get("instrument_token")
+                        symbol = sym.get(token)
+                        if symbol is None:
+                            symbol = f"TOKEN_{token}" if token else "UNKNOWN"
+                        tick["tradingsymbol"] = symbol
+                        name = nm.get(token)
+                        if name is not None:
+                            tick["name"] = name
+                    publish(ticks)
+                except Exception as e:
+                    logger.error("Socket %d publish error: %s", self.socket_id, e)
+            if stopping:
+                return
 
     def _on_connect(self, ws, response) -> None:
         self._connected = True
@@ -105,7 +147,17 @@ class SocketConnection:
     def _on_error(self, ws, code, reason) -> None:
         logger.error("Socket %d error [%s] %s", self.socket_id, code, reason)
 
+    def _on_noreconnect(self, ws) -> None:
+        self._connected = False
+        logger.critical("Socket %d max reconnects exhausted", self.socket_id)
+        if self._on_give_up is not None:
+            self._on_give_up(self)
+
     def start(self) -> threading.Thread:
+        self._publisher_thread = threading.Thread(
+            target=self._publish_loop, name=f"pub-{self.socket_id}", daemon=True
+        )
+        self._publisher_thread.start()
         t = threading.Thread(target=lambda: self.kws.connect(threaded=False), name=f"ws-{self.socket_id}", daemon=True)
         t.start()
         return t
@@ -116,6 +168,11 @@ class SocketConnection:
         except Exception as e:
             logger.warning("Socket %d close error: %s", self.socket_id, e)
         self._connected = False
+        if self._publisher_thread is not None:
+            # Flush what is already queued before the publisher is closed
+            self._queue.put(None)
+            self._publisher_thread.join(timeout=5)
+            self._publisher_thread = None
 
     @property
     def is_connected(self) -> bool:
@@ -134,7 +191,7 @@ class MultiSocketConnector:
     """Manages multiple WebSocket connections for distributed tick subscriptions."""
 
     def __init__(self, api_key: str, access_token: str, publisher: RedisPublisher, config: dict,
-                 token_to_symbol: dict):
+                 token_to_symbol: dict, on_failure: Optional[Callable[[], None]] = None):
         self.api_key = api_key
         self.access_token = access_token
         self.publisher = publisher
@@ -144,9 +201,34 @@ class MultiSocketConnector:
         self.reconnect_max_retries = config.get("reconnect_max_retries", 50)
         self.reconnect_max_delay = config.get("reconnect_max_delay", 60)
         self.sockets: list = []
+        # Running total across sockets; kept here so it survives reconnect_all()
+        self._tick_total = 0
+        self._tick_lock = threading.Lock()
+        # Sockets that exhausted their reconnects; on_failure fires (from that socket's
+        # thread) once every socket has given up
+        self._on_failure = on_failure
+        self._gave_up: set = set()
+        self.failed = False
+
+    def _count_ticks(self, n: int) -> None:
+        with self._tick_lock:
+            self._tick_total += n
+
+    def _socket_gave_up(self, sock: SocketConnection) -> None:
+        with self._tick_lock:
+            if sock not in self.sockets:  # already replaced by reconnect_all()
+                return
+            self._gave_up.add(sock.socket_id)
+            if self.failed or len(self._gave_up) < len(self.sockets):
+                return
+            self.failed = True
+        logger.critical("All %d sockets gave up reconnecting", len(self.sockets))
+        if self._on_failure is not None:
+            self._on_failure()
 
     def start(self, token_buckets: list) -> None:
         self.sockets = []
+        self._gave_up = set()
         active = [b for b in token_buckets if len(b) > 0]
         if not active:
             logger.warning("No tokens to subscribe")
@@ -162,6 +244,8 @@ class MultiSocketConnector:
                 token_to_symbol=self.token_to_symbol,
                 reconnect_max_retries=self.reconnect_max_retries,
                 reconnect_max_delay=self.reconnect_max_delay,
+                count_ticks=self._count_ticks,
+                on_give_up=self._socket_gave_up,
             )
             sock.start()
             self.sockets.append(sock)
@@ -183,7 +267,7 @@ class MultiSocketConnector:
 
     @property
     def total_tick_count(self) -> int:
-        return sum(s.tick_count for s in self.sockets)
+        return self._tick_total
 
     @property
     def all_connected(self) -> bool:
@@ -7,10 +7,15 @@ weekly + monthly expiries) and distributes instrument tokens across
 multiple WebSocket connections.
 """
 
+import heapq
 import logging
+import os
+import threading
+from collections import defaultdict
 from datetime import date
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 import pytz
 from kiteconnect import KiteConnect
@@ -18,6 +23,23 @@ from kiteconnect import KiteConnect
 logger = logging.getLogger(__name__)
 
 IST = pytz.timezone("Asia/Kolkata")
+MAX_TOKENS_PER_SOCKET = 3000  # Kite's per-connection subscription limit
+
+# Underlying spot instrument per derivative name: dump tradingsymbol and ltp() key
+_SPOT_NAME = {
+    "NIFTY": "NIFTY 50",
+    "BANKNIFTY": "NIFTY BANK",
+    "FINNIFTY": "NIFTY FIN SERVICE",
+    "MIDCPNIFTY": "NIFTY MID SELECT",
+    "SENSEX": "SENSEX",
+}
+_SPOT_LTP = {
+    "NIFTY": "NSE:NIFTY 50",
+    "BANKNIFTY": "NSE:NIFTY BANK",
+    "FINNIFTY": "NSE:NIFTY FIN SERVICE",
+    "MIDCPNIFTY": "NSE:NIFTY MID SELECT",
+    "SENSEX": "BSE:SENSEX",
+}
 
 
 class InstrumentManager:
@@ -30,22 +52,81 @@ class InstrumentManager:
         self.instrument_types = config.get("instrument_types", ["CE", "PE"])
         self.include_underlying = config.get("include_underlying", True)
         self.underlying_exchange = config.get("underlying_exchange", "NSE")
+        self.cache_dir = config.get("cache_dir", "./data/instruments")
 
         expiry_cfg = config.get("expiry_filter", {})
         self.weekly_expiries_count = expiry_cfg.get("weekly_expiries", 2)
         self.monthly_expiries_count = expiry_cfg.get("monthly_expiries", 2)
 
         self._instruments_df: Optional[pd.DataFrame] = None
+        self._fetch_lock = threading.Lock()
+        self._by_exchange_name: dict = {}
+        self._underlying_eq_pos: dict = {}
         self._token_symbol_map: dict = {}
+        self._spot_cache: dict[str, float] = {}
+
+    @property
+    def instruments(self) -> pd.DataFrame:
+        """Today's instrument dump, fetched once on first use (safe under concurrent callers)."""
+        df = self._instruments_df
+        if df is None:
+            with self._fetch_lock:
+                if self._instruments_df is None:
+                    self.fetch_instruments()
+                df = self._instruments_df
+        return df
 
     def fetch_instruments(self) -> pd.DataFrame:
-        """Download the full instrument dump from Zerodha."""
+        """Load today's instrument dump, from the local Parquet cache if present, else from Zerodha."""
+        cache_file = os.path.join(self.cache_dir, f"{date.today().isoformat()}.parquet")
+        if os.path.exists(cache_file):
+            try:
+                self._set_instruments(pd.read_parquet(cache_file))
+                logger.info("Loaded %d instruments from cache %s", len(self._instruments_df), cache_file)
+                return self._instruments_df
+            except Exception as e:
+                logger.warning("Instrument cache %s unreadable (%s), downloading", cache_file, e)
+
         logger.info("Downloading instrument list from Zerodha...")
         instruments = self.kite.instruments()
-        self._instruments_df = pd.DataFrame(instruments)
-        logger.info("Downloaded %d instruments", len(self._instruments_df))
+        df = pd.DataFrame(instruments)
+        # Kite returns date objects, or "" for non-derivatives; normalise so Parquet can store it
+        df["expiry"] = pd.to_datetime(df["expiry"], errors="coerce")
+        logger.info("Downloaded %d instruments", len(df))
+        self._write_cache(df, cache_file)
+        self._set_instruments(df)
         return self._instruments_df
 
+    def _set_instruments(self, df: pd.DataFrame) -> None:
+        # Expiry as datetime.date once per dump, for expiry selection and the token map
+        df["expiry_date"] = df["expiry"].dt.date
+        self._instruments_df = df
+        # Row positions per (exchange, name), so per-symbol lookups skip the full-dump scan
+        self._by_exchange_name = df.groupby(["exchange", "name"], sort=False).indices
+        # Underlying EQ rows by tradingsymbol (first occurrence wins, as with iloc[0])
+        eq = np.flatnonzero(
+            (df["exchange"].values == self.underlying_exchange) & (df["instrument_type"].values == "EQ")
+        )
+        self._underlying_eq_pos = dict(zip(df["tradingsymbol"].values[eq][::-1], eq[::-1]))
+
+    def _write_cache(self, df: pd.DataFrame, cache_file: str) -> None:
+        """Write the day's dump to cache_file and drop older days' files. Failures are non-fatal."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            df.to_parquet(
+                cache_file + ".tmp",
+                compression="zstd",
+                index=False,
+                use_dictionary=["tradingsymbol", "segment", "exchange"],
+            )
+            os.replace(cache_file + ".tmp", cache_file)
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if name.endswith(".parquet") and path != cache_file:
+                    os.remove(path)
+        except Exception as e:
+            logger.warning("Could not cache instruments to %s: %s", cache_file, e)
+
     def get_instruments_for_symbols(self, symbols: list[str]) -> list:
         """
         Get all instruments (derivatives + spot) for multiple symbols.
@@ -53,8 +134,8 @@ class InstrumentManager:
         plus underlying spot for each symbol. Distributes across sockets
         when used with distribute_tokens().
         """
-        if self._instruments_df is None:
-            self.fetch_instruments()
+        if self.strike_range_pct is not None:
+            self._prefetch_spot_prices(symbols)
 
         all_instruments = []
         for symbol in symbols:
@@ -73,26 +154,21 @@ class InstrumentManager:
 
     def get_derivative_tokens(self, symbol: str) -> list:
         """Filter instruments for the given symbol's derivatives (CE/PE/FUT, current+next week, current+next month)."""
-        if self._instruments_df is None:
-            self.fetch_instruments()
-
-        df = self._instruments_df
         today = date.today()
+        df = self.instruments.iloc[self._by_exchange_name.get((self.exchange, symbol), [])]
 
-        deriv_df = df[
-            (df["exchange"] == self.exchange)
-            & (df["name"] == symbol)
-            & (df["instrument_type"].isin(self.instrument_types))
-        ].copy()
-
-        deriv_df["expiry"] = pd.to_datetime(deriv_df["expiry"]).dt.date
-        deriv_df = deriv_df[deriv_df["expiry"] >= today]
+        mask = (
+            df["instrument_type"].isin(self.instrument_types).values
+            & (df["expiry"].values >= np.datetime64(today))
+        )
+        deriv_df = df[mask]
 
         logger.info("Found %d derivative contracts for %s", len(deriv_df), symbol)
 
-        unique_expiries = sorted(deriv_df["expiry"].unique())
+        # np.unique sorts in numpy; .tolist() on datetime64[D] boxes only the uniques as dates
+        unique_expiries = np.unique(deriv_df["expiry"].values.astype("datetime64[D]")).tolist()
         selected_expiries = self._select_target_expiries(unique_expiries, today)
-        deriv_df = deriv_df[deriv_df["expiry"].isin(selected_expiries)]
+        deriv_df = deriv_df[deriv_df["expiry_date"].isin(selected_expiries)]
         logger.info("Filtered to %d target expiries: %s", len(selected_expiries), [str(e) for e in sorted(selected_expiries)])
 
         # Strike filter applies only to options (CE/PE); futures (FUT) have no strike
@@ -105,15 +181,29 @@ class InstrumentManager:
                 strike_ok = (deriv_df["strike"] >= lower) & (deriv_df["strike"] <= upper)
                 deriv_df = deriv_df[~options_mask | strike_ok]
 
-        instruments_list = deriv_df.to_dict("records")
-        for inst in instruments_list:
-            self._token_symbol_map[inst["instrument_token"]] = {
-                "tradingsymbol": inst["tradingsymbol"],
-                "expiry": str(inst["expiry"]),
-                "strike": inst["strike"],
-                "instrument_type": inst["instrument_type"],
+        instruments_list = []
+        for token, tsym, expiry, strike, itype in zip(
+            deriv_df["instrument_token"].tolist(),
+            deriv_df["tradingsymbol"].tolist(),
+            deriv_df["expiry_date"].tolist(),
+            deriv_df["strike"].tolist(),
+            deriv_df["instrument_type"].tolist(),
+        ):
+            self._token_symbol_map[token] = {
+                "tradingsymbol": tsym,
+                "expiry": str(expiry),
+                "strike": strike,
+                "instrument_type": itype,
                 "name": symbol,
             }
+            instruments_list.append({
+                "instrument_token": token,
+                "tradingsymbol": tsym,
+                "name": symbol,
+                "expiry": expiry,
+                "strike": strike,
+                "instrument_type": itype,
+            })
 
         logger.info("Total derivative instruments to subscribe: %d", len(instruments_list))
         return instruments_list
@@ -149,31 +239,16 @@ class InstrumentManager:
         """Get the underlying index/equity instrument token."""
         if not self.include_underlying:
             return None
-        if self._instruments_df is None:
-            self.fetch_instruments()
-        df = self._instruments_df
-        spot_symbol_map = {
-            "NIFTY": "NIFTY 50",
-            "BANKNIFTY": "NIFTY BANK",
-            "FINNIFTY": "NIFTY FIN SERVICE",
-            "MIDCPNIFTY": "NIFTY MID SELECT",
-            "SENSEX": "SENSEX",
-        }
-        spot_name = spot_symbol_map.get(symbol, symbol)
-        underlying = df[
-            (df["exchange"] == self.underlying_exchange)
-            & (df["tradingsymbol"] == spot_name)
-            & (df["instrument_type"] == "EQ")
-        ]
-        if underlying.empty:
-            underlying = df[
-                (df["exchange"] == self.underlying_exchange)
-                & (df["name"] == spot_name)
-            ]
-        if underlying.empty:
+        df = self.instruments
+        spot_name = _SPOT_NAME.get(symbol, symbol)
+        pos = self._underlying_eq_pos.get(spot_name)
+        if pos is None:
+            by_name = self._by_exchange_name.get((self.underlying_exchange, spot_name), [])
+            pos = by_name[0] if len(by_name) else None
+        if pos is None:
             logger.warning("Could not find underlying for %s", symbol)
             return None
-        inst = underlying.iloc[0].to_dict()
+        inst = df.iloc[pos].to_dict()
         self._token_symbol_map[inst["instrument_token"]] = {
             "tradingsymbol": inst["tradingsymbol"],
             "name": symbol,
@@ -183,33 +258,57 @@ class InstrumentManager:
         }
         return inst
 
+    @staticmethod
+    def _ltp_symbol(symbol: str) -> str:
+        return _SPOT_LTP.get(symbol, f"NSE:{symbol}")
+
+    def _prefetch_spot_prices(self, symbols: list[str]) -> None:
+        """Fill _spot_cache for all symbols with one ltp() call."""
+        keys = {self._ltp_symbol(s): s for s in symbols}
+        try:
+            ltp_data = self.kite.ltp(list(keys))
+        except Exception as e:
+            logger.warning("Could not fetch spot prices for %s: %s", ", ".join(symbols), e)
+            return
+        for key, quote in (ltp_data or {}).items():
+            if key in keys:
+                self._spot_cache[keys[key]] = quote["last_price"]
+
     def _get_spot_price(self, symbol: str) -> Optional[float]:
+        if symbol in self._spot_cache:
+            return self._spot_cache[symbol]
         try:
-            spot_symbol_map = {
-                "NIFTY": "NSE:NIFTY 50",
-                "BANKNIFTY": "NSE:NIFTY BANK",
-                "FINNIFTY": "NSE:NIFTY FIN SERVICE",
-                "MIDCPNIFTY": "NSE:NIFTY MID SELECT",
-                "SENSEX": "BSE:SENSEX",
-            }
-            exchange_symbol = spot_symbol_map.get(symbol, f"NSE:{symbol}")
-            ltp_data = self.kite.ltp([exchange_symbol])
+            ltp_data = self.kite.ltp([self._ltp_symbol(symbol)])
             if ltp_data:
                 key = list(ltp_data.keys())[0]
-                return ltp_data[key]["last_price"]
+                self._spot_cache[symbol] = ltp_data[key]["last_price"]
+                return self._spot_cache[symbol]
         except Exception as e:
             logger.warning("Could not fetch spot price for %s: %s", symbol, e)
         return None
 
     def distribute_tokens(self, instruments: list, num_sockets: int = 3) -> list:
-        """Distribute instrument tokens across N WebSocket connections."""
+        """Distribute instrument tokens across N WebSocket connections.
+
+        Each (name, expiry) group stays on one socket; groups are placed largest-first
+        on the least-loaded socket (LPT). Falls back to round-robin if that would put
+        more than MAX_TOKENS_PER_SOCKET on a socket.
+        """
         num_sockets = min(num_sockets, 3)
         tokens = [inst["instrument_token"] for inst in instruments]
         if not tokens:
             return [[] for _ in range(num_sockets)]
+        groups: dict = defaultdict(list)
+        for inst in instruments:
+            groups[(inst.get("name"), str(inst.get("expiry")))].append(inst["instrument_token"])
         buckets = [[] for _ in range(num_sockets)]
-        for i, token in enumerate(tokens):
-            buckets[i % num_sockets].append(token)
+        heap = [(0, idx) for idx in range(num_sockets)]
+        for group in sorted(groups.values(), key=len, reverse=True):
+            load, idx = heapq.heappop(heap)
+            buckets[idx].extend(group)
+            heapq.heappush(heap, (load + len(group), idx))
+        if max(len(b) for b in buckets) > MAX_TOKENS_PER_SOCKET:
+            buckets = [tokens[i::num_sockets] for i in range(num_sockets)]
         for idx, bucket in enumerate(buckets):
             logger.info("Socket %d: %d instruments", idx, len(bucket))
         return buckets
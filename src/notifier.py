@@ -1,12 +1,17 @@
 """Telegram notifications for the tick data pipeline."""
 
 import logging
+import queue
+import threading
 from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+QUEUE_SIZE = 256
+
 
 class TelegramNotifier:
     """Sends status messages to a Telegram chat via the Bot API."""
@@ -15,7 +20,17 @@ class TelegramNotifier:
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.enabled = enabled and bool(bot_token) and bool(chat_id)
-        if not self.enabled:
+        self._url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        # One pooled session so repeat sends reuse the TCP+TLS connection
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        # Messages go out on a background thread so callers never wait on the Bot API
+        self._queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._worker: Optional[threading.Thread] = None
+        if self.enabled:
+            self._worker = threading.Thread(target=self._send_loop, name="telegram", daemon=True)
+            self._worker.start()
+        else:
             logger.warning("Telegram notifications disabled (missing token/chat_id or enabled=false)")
 
     @classmethod
@@ -29,12 +44,39 @@ class TelegramNotifier:
         return cls(bot_token=bot_token, chat_id=chat_id, enabled=enabled)
 
     def send(self, message: str) -> bool:
-        """Send a message. Returns True on success. Never raises."""
+        """Queue a message for sending. Returns True if queued. Never raises or blocks."""
         if not self.enabled:
             return False
         try:
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-            resp = requests.post(url, json={
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            logger.warning("Telegram queue full, dropping message: %s", message[:80])
+            return False
+
+    def close(self, timeout: float = 15) -> None:
+        """Flush queued messages (up to timeout) and stop the sender thread."""
+        if self._worker is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Telegram queue still full on close, dropping pending messages")
+            return
+        self._worker.join(timeout)
+        self._worker = None
+
+    def _send_loop(self) -> None:
+        while True:
+            message = self._queue.get()
+            if message is None:
+                return
+            self._send_now(message)
+
+    def _send_now(self, message: str) -> bool:
+        """POST one message to the Bot API. Returns True on success. Never raises."""
+        try:
+            resp = self._session.post(self._url, json={
                 "chat_id": self.chat_id,
                 "text": message,
                 "parse_mode": "HTML",
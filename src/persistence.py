@@ -1,5 +1,6 @@
 """
-Persistence module. Periodically dumps tick data from Redis buffer to SQLite on disk.
+Persistence module. Periodically dumps tick data from Redis buffer to SQLite on disk,
+and optionally appends each batch to a Parquet dataset (persistence.parquet_enabled).
 """
 
 import logging
@@ -10,6 +11,35 @@ from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# Parquet column types shared by the receiver's sink and scripts/export_parquet.py so
+# files from either read as one dataset. trade_date is the hive partition, not a column.
+PARQUET_TYPES = {
+    "ticks": {
+        "id": "int64", "instrument_token": "int64", "tradingsymbol": "string",
+        "exchange_timestamp": "string", "last_price": "double", "last_traded_quantity": "int64",
+        "average_traded_price": "double", "volume_traded": "int64",
+        "total_buy_quantity": "int64", "total_sell_quantity": "int64",
+        "open": "double", "high": "double", "low": "double", "close": "double",
+        "change_pct": "double", "oi": "int64", "oi_day_high": "int64", "oi_day_low": "int64",
+        "tick_mode": "string", "received_at": "string",
+    },
+    "tick_depths": {
+        "id": "int64", "tick_id": "int64", "side": "string", "level": "int64",
+        "price": "double", "quantity": "int64", "orders": "int64",
+    },
+}
+PARQUET_DICTIONARY_COLUMNS = {"ticks": ["tradingsymbol", "tick_mode"], "tick_depths": ["side"]}
+# Written by export_parquet.py into a partition once it holds the whole closed day; the
+# receiver's sink never writes it, since its part files may cover only part of a day.
+PARQUET_COMPLETE_MARKER = "_SUCCESS"
+
+
+def parquet_schema(table: str):
+    """pyarrow schema for a PARQUET_TYPES table."""
+    import pyarrow as pa
+
+    return pa.schema([(name, pa.type_for_alias(t)) for name, t in PARQUET_TYPES[table].items()])
+
 
 class TickPersistence:
     """Persists tick data to SQLite."""
@@ -26,9 +56,15 @@ class TickPersistence:
 
     def initialize_db(self) -> None:
         """Create SQLite database and tables if not exist."""
-        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # Autocommit mode: persist_ticks brackets each batch in its own BEGIN IMMEDIATE.
+        # The timeout covers waiting on another receiver's dump (run_receiver.py --consumers).
+        self._conn = sqlite3.connect(self.db_path, timeout=60, check_same_thread=False, isolation_level=None)
         self._conn.execute("PRAGMA journal_mode=WAL")
         self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA cache_size=-65536")  # 64 MB: keep index B-trees resident
+        self._conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.execute("PRAGMA wal_autocheckpoint=10000")  # pages; fewer checkpoints per dump
         self._conn.executescript("""
             CREATE TABLE IF NOT EXISTS ticks (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -52,76 +88,169 @@ class TickPersistence:
                 price REAL, quantity INTEGER, orders INTEGER,
                 FOREIGN KEY (tick_id) REFERENCES ticks(id)
             );
+            CREATE TABLE IF NOT EXISTS daily_liquidity_summary (
+                trade_date TEXT NOT NULL,
+                tradingsymbol TEXT NOT NULL,
+                avg_spread REAL, avg_spread_bps REAL, total_volume INTEGER,
+                session_volume INTEGER, avg_bid_qty REAL, avg_ask_qty REAL,
+                avg_bid_orders REAL, avg_ask_orders REAL,
+                PRIMARY KEY (trade_date, tradingsymbol)
+            );
             CREATE INDEX IF NOT EXISTS idx_ticks_token_date ON ticks(instrument_token, trade_date);
-            CREATE INDEX IF NOT EXISTS idx_ticks_symbol_date ON ticks(tradingsymbol, trade_date);
-            CREATE INDEX IF NOT EXISTS idx_ticks_timestamp ON ticks(exchange_timestamp);
-            CREATE INDEX IF NOT EXISTS idx_depths_tick_id ON tick_depths(tick_id);
+            CREATE INDEX IF NOT EXISTS idx_depths_tick_side_level ON tick_depths(tick_id, side, level, price, quantity, orders);
+        """)
+        self._add_generated_columns()
+        # Every index is one more B-tree insert per row; drop the ones a wider index
+        # already covers (same leading columns) or that no query uses.
+        self._conn.executescript("""
+            DROP INDEX IF EXISTS idx_ticks_symbol_date_ts;
+            DROP INDEX IF EXISTS idx_ticks_symbol_date;
+            DROP INDEX IF EXISTS idx_ticks_timestamp;
+            DROP INDEX IF EXISTS idx_depths_tick_id;
+            CREATE INDEX IF NOT EXISTS idx_ticks_symbol_date_time ON ticks(tradingsymbol, trade_date, exchange_time);
         """)
         self._conn.commit()
         logger.info("SQLite initialized at %s", self.db_path)
 
+    # Derived columns for time-of-day filters and integer timestamps; virtual, so
+    # existing rows need no backfill and inserts are unchanged.
+    GENERATED_COLUMNS = {
+        "exchange_time": "TEXT GENERATED ALWAYS AS (substr(exchange_timestamp, 12, 8)) VIRTUAL",
+        "exchange_epoch": "INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', exchange_timestamp) AS INTEGER)) VIRTUAL",
+    }
+
+    def _add_generated_columns(self) -> None:
+        """Add any missing GENERATED_COLUMNS to ticks."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_xinfo(ticks)")}
+        for name, definition in self.GENERATED_COLUMNS.items():
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE ticks ADD COLUMN {name} {definition}")
+                logger.info("Added ticks.%s column", name)
+
     def persist_ticks(self, ticks_data: list) -> int:
-        """Write a batch of ticks to SQLite."""
+        """Write a batch of ticks (receiver.Tick structs) to SQLite.
+
+        Raises on failure, after rolling back, so the caller keeps the batch and retries.
+        """
         if not self._conn:
             self.initialize_db()
         if not ticks_data:
             return 0
-        persisted = 0
         cursor = self._conn.cursor()
         try:
-            for tick in ticks_data:
-                ohlc = tick.get("ohlc", {})
-                exchange_ts = tick.get("exchange_timestamp", "")
-                trade_date = self._trade_date(exchange_ts)
-                cursor.execute("""
-                    INSERT INTO ticks (
-                        instrument_token, tradingsymbol, exchange_timestamp,
-                        last_price, last_traded_quantity, average_traded_price,
-                        volume_traded, total_buy_quantity, total_sell_quantity,
-                        open, high, low, close, change_pct, oi, oi_day_high, oi_day_low,
-                        tick_mode, received_at, trade_date
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    tick.get("instrument_token"),
-                    tick.get("tradingsymbol", ""),
+            # The write lock is held from here, so ids read from sqlite_sequence stay
+            # ours even with several receivers on one DB; depth rows then need no lastrowid.
+            cursor.execute("BEGIN IMMEDIATE")
+            seq = dict(cursor.execute(
+                "SELECT name, seq FROM sqlite_sequence WHERE name IN ('ticks', 'tick_depths')"
+            ).fetchall())
+            last_id, depth_id = seq.get("ticks", 0), seq.get("tick_depths", 0)
+            now = datetime.now().isoformat()
+            today = date.today().isoformat()
+            tick_rows = []
+            depth_rows = []
+            for tick_id, tick in enumerate(ticks_data, start=last_id + 1):
+                ohlc = tick.ohlc
+                exchange_ts = tick.exchange_timestamp or ""
+                tick_rows.append((
+                    tick_id,
+                    tick.instrument_token,
+                    tick.tradingsymbol or "",
                     exchange_ts,
-                    tick.get("last_price"),
-                    tick.get("last_traded_quantity"),
-                    tick.get("average_traded_price"),
-                    tick.get("volume_traded"),
-                    tick.get("total_buy_quantity"),
-                    tick.get("total_sell_quantity"),
-                    ohlc.get("open"), ohlc.get("high"), ohlc.get("low"), ohlc.get("close"),
-                    tick.get("change"),
-                    tick.get("oi"), tick.get("oi_day_high"), tick.get("oi_day_low"),
-                    tick.get("mode", ""),
-                    tick.get("received_at", datetime.now().isoformat()),
-                    trade_date,
+                    tick.last_price,
+                    tick.last_traded_quantity,
+                    tick.average_traded_price,
+                    tick.volume_traded,
+                    tick.total_buy_quantity,
+                    tick.total_sell_quantity,
+                    *((ohlc.open, ohlc.high, ohlc.low, ohlc.close) if ohlc else (None,) * 4),
+                    tick.change,
+                    tick.oi, tick.oi_day_high, tick.oi_day_low,
+                    tick.mode or "",
+                    tick.received_at or now,
+                    self._trade_date(exchange_ts, today),
                 ))
-                tick_id = cursor.lastrowid
-                depth = tick.get("depth", {})
-                for side in ("buy", "sell"):
-                    for level, entry in enumerate(depth.get(side, [])):
-                        cursor.execute(
-                            "INSERT INTO tick_depths (tick_id, side, level, price, quantity, orders) VALUES (?, ?, ?, ?, ?, ?)",
-                            (tick_id, side, level, entry.get("price"), entry.get("quantity"), entry.get("orders")),
-                        )
-                persisted += 1
+                depth = tick.depth
+                if depth:
+                    for side, levels in (("buy", depth.buy), ("sell", depth.sell)):
+                        for level, entry in enumerate(levels):
+                            depth_id += 1
+                            depth_rows.append((
+                                depth_id, tick_id, side, level,
+                                entry.price, entry.quantity, entry.orders,
+                            ))
+            cursor.executemany("""
+                INSERT INTO ticks (
+                    id, instrument_token, tradingsymbol, exchange_timestamp,
+                    last_price, last_traded_quantity, average_traded_price,
+                    volume_traded, total_buy_quantity, total_sell_quantity,
+                    open, high, low, close, change_pct, oi, oi_day_high, oi_day_low,
+                    tick_mode, received_at, trade_date
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, tick_rows)
+            cursor.executemany(
+                "INSERT INTO tick_depths (id, tick_id, side, level, price, quantity, orders) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                depth_rows,
+            )
             self._conn.commit()
+            persisted = len(tick_rows)
             logger.info("Persisted %d ticks to SQLite", persisted)
-        except sqlite3.Error as e:
-            logger.error("SQLite error: %s", e)
-            self._conn.rollback()
+        except BaseException as e:
+            # Anything between BEGIN IMMEDIATE and commit (not just sqlite3.Error) would
+            # otherwise leave the transaction, and the DB write lock, open.
+            logger.error("SQLite write failed, rolling back %d ticks: %s", len(ticks_data), e)
+            try:
+                self._conn.rollback()
+            except sqlite3.Error as rollback_error:
+                logger.error("Rollback failed: %s", rollback_error)
+            raise
+        if self.parquet_enabled:
+            self._write_parquet(tick_rows, depth_rows)
         return persisted
 
+    def _write_parquet(self, tick_rows: list, depth_rows: list) -> None:
+        """Append a committed batch to the Parquet dataset: one file per trade_date per table.
+
+        Layout matches scripts/export_parquet.py ({parquet_dir}/{table}/trade_date=D/part-<id>.parquet).
+        SQLite stays the source of truth; a failed write is logged and that day can be
+        rebuilt with export_parquet.py --date.
+        """
+        ticks_by_date: dict = {}
+        for row in tick_rows:
+            ticks_by_date.setdefault(row[-1], []).append(row[:-1])
+        date_of = {row[0]: row[-1] for row in tick_rows}
+        depths_by_date: dict = {}
+        for row in depth_rows:
+            depths_by_date.setdefault(date_of[row[1]], []).append(row)
+        for trade_date, rows in ticks_by_date.items():
+            try:
+                name = f"part-{rows[0][0]}.parquet"
+                # Depths first, so a ticks file never points at depth rows not yet on disk.
+                # The dashboard ignores these partitions until the export marks them complete.
+                self._write_parquet_file("tick_depths", trade_date, name, depths_by_date.get(trade_date, []))
+                self._write_parquet_file("ticks", trade_date, name, rows)
+            except Exception as e:
+                logger.error("Parquet write failed for %s (rebuild with export_parquet.py --date): %s", trade_date, e)
+
+    def _write_parquet_file(self, table: str, trade_date: str, name: str, rows: list) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = parquet_schema(table)
+        columns = list(zip(*rows)) if rows else [()] * len(schema)
+        arrow_table = pa.table([pa.array(c, type=f.type) for c, f in zip(columns, schema)], schema=schema)
+        path = os.path.join(self.parquet_dir, table, f"trade_date={trade_date}", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        pq.write_table(arrow_table, tmp, compression="zstd", use_dictionary=PARQUET_DICTIONARY_COLUMNS[table])
+        os.replace(tmp, path)
+
     @staticmethod
-    def _trade_date(ts_str: str) -> str:
-        try:
-            if ts_str:
-                return datetime.fromisoformat(ts_str).strftime("%Y-%m-%d")
-        except (ValueError, TypeError):
-            pass
-        return date.today().isoformat()
+    def _trade_date(ts_str: str, default: Optional[str] = None) -> str:
+        # exchange_timestamp is ISO-8601 (YYYY-MM-DDTHH:MM:SS); the date is its prefix
+        if isinstance(ts_str, str) and len(ts_str) >= 10 and ts_str[4] == "-" and ts_str[7] == "-":
+            return ts_str[:10]
+        return default or date.today().isoformat()
 
     def close(self) -> None:
         if self._conn:
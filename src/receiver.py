@@ -9,19 +9,97 @@ This runs as a separate process from the WebSocket connector to ensure
 the socket pipeline is never blocked by processing work.
 """
 
-import json
 import logging
 import threading
 import time
+from collections import deque
 from datetime import datetime, date
+from functools import lru_cache
 from typing import Optional
 
+import msgspec
 import redis
 
 from src.persistence import TickPersistence
 
 logger = logging.getLogger(__name__)
 
+READ_COUNT = 1000
+TTL_REFRESH_FRACTION = 0.25
+TTL_CACHE_MAX_KEYS = 100_000
+# Room for this many dump intervals of ticks before the oldest are dropped
+BUFFER_DUMP_INTERVALS = 3
+DROP_LOG_INTERVAL = 10.0
+
+
+class DepthLevel(msgspec.Struct):
+    price: float = 0.0
+    quantity: int = 0
+    orders: int = 0
+
+
+class Depth(msgspec.Struct):
+    buy: list[DepthLevel] = []
+    sell: list[DepthLevel] = []
+
+
+class OHLC(msgspec.Struct):
+    open: Optional[float] = None
+    high: Optional[float] = None
+    low: Optional[float] = None
+    close: Optional[float] = None
+
+
+class Tick(msgspec.Struct):
+    """The KiteTicker tick fields the receiver uses; anything else in the payload is skipped.
+
+    Absent fields are None, as dict.get used to return, so SQLite still stores NULL.
+    """
+    instrument_token: int = 0
+    tradingsymbol: Optional[str] = None
+    exchange_timestamp: Optional[str] = None
+    last_price: Optional[float] = None
+    last_traded_quantity: Optional[int] = None
+    average_traded_price: Optional[float] = None
+    volume_traded: Optional[int] = None
+    total_buy_quantity: Optional[int] = None
+    total_sell_quantity: Optional[int] = None
+    ohlc: Optional[OHLC] = None
+    change: Optional[float] = None
+    oi: Optional[int] = None
+    oi_day_high: Optional[int] = None
+    oi_day_low: Optional[int] = None
+    mode: Optional[str] = None
+    depth: Optional[Depth] = None
+    received_at: Optional[str] = None
+
+
+_decoder = msgspec.msgpack.Decoder(Tick)
+_json_decoder = msgspec.json.Decoder(Tick)
+
+
+# (latest:{symbol} hash field, Tick attribute); redis-py encodes the numbers itself
+LATEST_FIELDS = (
+    ("last_price", "last_price"),
+    ("volume", "volume_traded"),
+    ("oi", "oi"),
+    ("total_buy_qty", "total_buy_quantity"),
+    ("total_sell_qty", "total_sell_quantity"),
+)
+
+
+@lru_cache(maxsize=4096)
+def _parse_ts(ts_str: str) -> Optional[tuple[float, str]]:
+    """(unix score, YYYY-MM-DD) from one parse of an ISO timestamp; None if it doesn't parse.
+
+    Cached: exchange timestamps have second resolution, so most ticks in a batch share one.
+    """
+    try:
+        dt = datetime.fromisoformat(ts_str)
+    except (ValueError, TypeError):
+        return None
+    return dt.timestamp(), dt.date().isoformat()
+
 
 class TickReceiver:
     """
@@ -42,17 +120,32 @@ class TickReceiver:
         self.stream_name = redis_config.get("stream_name", "ticks:raw")
         self.consumer_group = redis_config.get("consumer_group", "tick_processors")
         self.consumer_name = redis_config.get("consumer_name", "receiver_1")
+        self.reliable_ack = redis_config.get("reliable_ack", False)
         self.redis_key_ttl = persistence_config.get("redis_key_ttl_seconds", 86400)
 
         self._client: Optional[redis.Redis] = None
         self._persistence = TickPersistence(persistence_config)
         self._dump_interval = persistence_config.get("dump_interval_seconds", 300)
+        tick_rate = persistence_config.get("expected_tick_rate", 2000)
+        self._buffer_limit = tick_rate * self._dump_interval * BUFFER_DUMP_INTERVALS
+        self._flush_threshold = persistence_config.get("flush_threshold", 50_000)
+        # Wakes the persist thread early: buffer past flush_threshold, or stop()
+        self._wake = threading.Event()
 
         self._running = False
         self._ticks_processed = 0
+        self._ticks_dropped = 0
+        self._last_drop_log = 0.0
         self._persist_thread: Optional[threading.Thread] = None
-        self._pending_persist_buffer: list[dict] = []
-        self._buffer_lock = threading.Lock()
+        # Single producer (consume loop) / single consumer (persist thread): deque
+        # extend and popleft are atomic, so neither side takes a lock. Bounded so a
+        # stuck SQLite drops the oldest ticks instead of exhausting memory.
+        self._pending_persist_buffer: deque = deque(maxlen=self._buffer_limit)
+        # key -> monotonic time its TTL was last refreshed, so EXPIRE goes out
+        # at most every TTL_REFRESH_FRACTION of the TTL instead of on every tick
+        self._ttl_set_at: dict[bytes, float] = {}
+        # (symbol, date) -> encoded (ticks, latest, symbols) keys, built on first use
+        self._key_cache: dict[tuple[str, str], tuple[bytes, bytes, bytes]] = {}
 
     def connect(self) -> None:
         """Establish Redis connection and ensure consumer group exists."""
@@ -62,7 +155,7 @@ class TickReceiver:
             port=self.port,
             db=self.db,
             password=self.password,
-            decode_responses=True,
+            decode_responses=False,  # stream payloads are msgpack bytes
             socket_connect_timeout=5,
             socket_keepalive=True,
             retry_on_timeout=True,
@@ -117,7 +210,9 @@ class TickReceiver:
         """
         Main loop: read from Redis stream using consumer groups.
 
-        Uses XREADGROUP for reliable consumption with acknowledgement.
+        With reliable_ack, entries stay in the group's pending list until the batch's
+        XACK; otherwise they are read with NOACK. Either way the group's last-delivered
+        ID means a restarted receiver resumes after the last batch it was handed.
         """
         while self._running:
             try:
@@ -126,26 +221,46 @@ class TickReceiver:
                     groupname=self.consumer_group,
                     consumername=self.consumer_name,
                     streams={self.stream_name: ">"},
-                    count=100,
+                    count=READ_COUNT,
                     block=1000,
+                    noack=not self.reliable_ack,
                 )
 
                 if not messages:
                     continue
 
                 for stream_name, entries in messages:
+                    # One pipeline per batch: every tick's writes (plus the XACK)
+                    # go out in a single round-trip
+                    pipe = self._client.pipeline(transaction=False)
+                    # The whole batch arrived in one reply: stamp it once
+                    received_at = datetime.now().isoformat()
+                    ticks = []
                     for entry_id, fields in entries:
                         try:
-                            self._process_entry(entry_id, fields)
+                            tick = self._process_entry(pipe, entry_id, fields, received_at)
                         except Exception as e:
                             logger.error(
                                 "Error processing entry %s: %s", entry_id, e
                             )
-
-                        # Acknowledge the message
-                        self._client.xack(
-                            self.stream_name, self.consumer_group, entry_id
+                            continue
+                        if tick is not None:
+                            ticks.append(tick)
+                    # Hand the batch to the persist thread in one append
+                    self._note_overflow(len(ticks))
+                    self._pending_persist_buffer.extend(ticks)
+                    if len(self._pending_persist_buffer) >= self._flush_threshold and not self._wake.is_set():
+                        self._wake.set()
+
+                    if self.reliable_ack:
+                        pipe.xack(
+                            self.stream_name,
+                            self.consumer_group,
+                            *(entry_id for entry_id, _ in entries),
                         )
+                    for result in pipe.execute(raise_on_error=False):
+                        if isinstance(result, redis.ResponseError):
+                            logger.error("Failed to store tick in Redis: %s", result)
 
             except redis.ConnectionError as e:
                 logger.error("Redis connection lost: %s. Reconnecting...", e)
@@ -160,109 +275,128 @@ class TickReceiver:
                 logger.error("Unexpected error in consume loop: %s", e)
                 time.sleep(1)
 
-    def _process_entry(self, entry_id: str, fields: dict) -> None:
+    def _process_entry(
+        self, pipe, entry_id: bytes, fields: dict, received_at: str
+    ) -> Optional[Tick]:
         """
         Process a single stream entry:
           1. Deserialize the tick data
-          2. Store organized data in Redis (by symbol + time)
-          3. Buffer for periodic SQLite persistence
+          2. Queue organized Redis writes (by symbol + time) on the batch pipeline
+          3. Return the tick for periodic SQLite persistence (None if the entry is empty)
 
         Args:
+            pipe: The batch's Redis pipeline; executed by the caller.
             entry_id: Redis stream entry ID.
-            fields: Entry fields (contains 'data' key with JSON tick).
+            fields: Entry fields (b'm' with a msgpack tick; legacy entries carry b'data' JSON).
+            received_at: ISO time the entry's XREADGROUP batch was read.
         """
-        raw_data = fields.get("data", "")
-        if not raw_data:
-            return
-
-        tick = json.loads(raw_data)
-        tick["received_at"] = datetime.now().isoformat()
+        raw_data = fields.get(b"m")
+        if raw_data:
+            tick = _decoder.decode(raw_data)
+        else:
+            raw_data = fields.get(b"data")
+            if not raw_data:
+                return None
+            tick = _json_decoder.decode(raw_data)
+        tick.received_at = received_at
         self._ticks_processed += 1
 
         # Extract key fields
-        instrument_token = tick.get("instrument_token", 0)
-        tradingsymbol = tick.get("tradingsymbol", "TOKEN_%d" % instrument_token)
-        exchange_ts = tick.get("exchange_timestamp", "")
-        trade_date = self._extract_date(exchange_ts)
+        tradingsymbol = tick.tradingsymbol or "TOKEN_%d" % tick.instrument_token
+        exchange_ts = tick.exchange_timestamp or ""
+        parsed = _parse_ts(exchange_ts) if exchange_ts else None
+        ts_score, trade_date = parsed or (time.time(), date.today().isoformat())
 
         # Store structured data in Redis
-        self._store_in_redis(tick, tradingsymbol, trade_date, exchange_ts)
+        self._queue_in_redis(pipe, raw_data, tick, tradingsymbol, trade_date, exchange_ts, ts_score)
 
-        # Buffer for periodic persistence to disk
-        tick["tradingsymbol"] = tradingsymbol
-        with self._buffer_lock:
-            self._pending_persist_buffer.append(tick)
+        # Caller buffers it for periodic persistence to disk
+        tick.tradingsymbol = tradingsymbol
+        return tick
 
-    def _store_in_redis(
+    def _queue_in_redis(
         self,
-        tick: dict,
+        pipe,
+        raw_data: bytes,
+        tick: Tick,
         tradingsymbol: str,
         trade_date: str,
         exchange_ts: str,
+        ts_score: float,
     ) -> None:
         """
-        Store the processed tick in Redis organized by symbol and time.
+        Queue the processed tick's Redis writes, organized by symbol and time,
+        on the caller's pipeline.
 
         Redis key structure:
           - Sorted set  ticks:{symbol}:{date}
-              Score = unix timestamp, Value = serialized tick JSON
+              Score = unix timestamp, Value = stream payload as published
+              (msgpack; JSON for legacy entries), stored without re-encoding.
+              This includes the depth (level 5 or 20), so there is no separate
+              depth key to encode.
           - Hash  latest:{symbol}
-              Latest tick snapshot for quick access
+              Latest tick snapshot for quick access, including received_at
           - Set  symbols:{date}
               Tracks all active symbols for a given date
-          - Sorted set  depth:{symbol}:{date}
-              Depth snapshots (level 5 or 20) with timestamp scores
         """
-        try:
-            pipe = self._client.pipeline(transaction=False)
-
-            # 1. Sorted set: full tick history by symbol and date
-            ts_score = self._timestamp_to_score(exchange_ts)
-            tick_key = "ticks:%s:%s" % (tradingsymbol, trade_date)
-            tick_json = json.dumps(tick)
-            pipe.zadd(tick_key, {tick_json: ts_score})
-            pipe.expire(tick_key, self.redis_key_ttl)
-
-            # 2. Hash: latest tick snapshot for quick access
-            latest_key = "latest:%s" % tradingsymbol
-            latest_data = {
-                "last_price": str(tick.get("last_price", "")),
-                "volume": str(tick.get("volume_traded", "")),
-                "oi": str(tick.get("oi", "")),
-                "bid": str(self._get_best_bid(tick)),
-                "ask": str(self._get_best_ask(tick)),
-                "exchange_timestamp": exchange_ts,
-                "total_buy_qty": str(tick.get("total_buy_quantity", "")),
-                "total_sell_qty": str(tick.get("total_sell_quantity", "")),
-            }
-            pipe.hset(latest_key, mapping=latest_data)
-            pipe.expire(latest_key, self.redis_key_ttl)
-
-            # 3. Track active symbols per date
-            symbols_key = "symbols:%s" % trade_date
-            pipe.sadd(symbols_key, tradingsymbol)
-            pipe.expire(symbols_key, self.redis_key_ttl)
-
-            # 4. Store depth data separately (level 5 or 20)
-            depth = tick.get("depth", {})
-            if depth:
-                depth_key = "depth:%s:%s" % (tradingsymbol, trade_date)
-                depth_entry = json.dumps({
-                    "timestamp": exchange_ts,
-                    "buy": depth.get("buy", []),
-                    "sell": depth.get("sell", []),
-                })
-                pipe.zadd(depth_key, {depth_entry: ts_score})
-                pipe.expire(depth_key, self.redis_key_ttl)
-
-            pipe.execute()
-
-        except redis.RedisError as e:
-            logger.error("Failed to store tick in Redis: %s", e)
+        now = time.monotonic()
+        keys = self._key_cache.get((tradingsymbol, trade_date))
+        if keys is None:
+            keys = self._build_keys(tradingsymbol, trade_date)
+        tick_key, latest_key, symbols_key = keys
+
+        # 1. Sorted set: full tick history by symbol and date
+        pipe.zadd(tick_key, {raw_data: ts_score})
+        self._queue_expire(pipe, tick_key, now)
+
+        # 2. Hash: latest tick snapshot for quick access
+        latest_data = {
+            field: value for field, attr in LATEST_FIELDS
+            if (value := getattr(tick, attr)) is not None
+        }
+        latest_data["bid"] = self._get_best_bid(tick)
+        latest_data["ask"] = self._get_best_ask(tick)
+        latest_data["exchange_timestamp"] = exchange_ts
+        latest_data["received_at"] = tick.received_at
+        pipe.hset(latest_key, mapping=latest_data)
+        self._queue_expire(pipe, latest_key, now)
+
+        # 3. Track active symbols per date
+        pipe.sadd(symbols_key, tradingsymbol)
+        self._queue_expire(pipe, symbols_key, now)
+
+    def _build_keys(self, tradingsymbol: str, trade_date: str) -> tuple[bytes, bytes, bytes]:
+        """Format and encode the Redis keys for a (symbol, date) once and cache them."""
+        if len(self._key_cache) >= TTL_CACHE_MAX_KEYS:
+            # Mostly earlier days' symbols; live ones are rebuilt on their next tick
+            self._key_cache.clear()
+        keys = (
+            ("ticks:%s:%s" % (tradingsymbol, trade_date)).encode(),
+            ("latest:%s" % tradingsymbol).encode(),
+            ("symbols:%s" % trade_date).encode(),
+        )
+        self._key_cache[(tradingsymbol, trade_date)] = keys
+        return keys
+
+    def _queue_expire(self, pipe, key: bytes, now: float) -> None:
+        """Queue EXPIRE for key unless its TTL was refreshed recently.
+
+        Keys stay alive at least (1 - TTL_REFRESH_FRACTION) of the TTL after
+        their last write.
+        """
+        set_at = self._ttl_set_at.get(key)
+        if set_at is not None and now - set_at < self.redis_key_ttl * TTL_REFRESH_FRACTION:
+            return
+        if len(self._ttl_set_at) >= TTL_CACHE_MAX_KEYS:
+            # Mostly keys from earlier days; anything still live just gets one extra EXPIRE
+            self._ttl_set_at.clear()
+        self._ttl_set_at[key] = now
+        pipe.expire(key, self.redis_key_ttl)
 
     def _periodic_persist(self) -> None:
         """
-        Background thread: periodically flush buffered ticks to SQLite.
+        Background thread: flush buffered ticks to SQLite every dump interval,
+        or sooner once flush_threshold ticks are waiting or the receiver stops.
 
         Ensures data is saved to persistent disk storage (not just RAM).
         """
@@ -271,15 +405,13 @@ class TickReceiver:
         )
 
         while self._running:
-            time.sleep(self._dump_interval)
+            self._wake.wait(timeout=self._dump_interval)
+            self._wake.clear()
 
-            # Swap out the buffer atomically
-            with self._buffer_lock:
-                if not self._pending_persist_buffer:
-                    logger.debug("No ticks to persist in this cycle")
-                    continue
-                batch = self._pending_persist_buffer
-                self._pending_persist_buffer = []
+            batch = self._drain_buffer()
+            if not batch:
+                logger.debug("No ticks to persist in this cycle")
+                continue
 
             logger.info("Persisting %d ticks to SQLite...", len(batch))
             try:
@@ -287,81 +419,86 @@ class TickReceiver:
                 logger.info("Successfully persisted %d ticks", count)
             except Exception as e:
                 logger.error("Persistence failed: %s", e)
-                # Put the failed batch back so we don't lose data
-                with self._buffer_lock:
-                    self._pending_persist_buffer = (
-                        batch + self._pending_persist_buffer
-                    )
+                self._requeue(batch)
+                # The buffer is likely still past flush_threshold; back off a full
+                # interval instead of retrying on every threshold wake-up
+                retry_at = time.monotonic() + self._dump_interval
+                while self._running and time.monotonic() < retry_at:
+                    self._wake.wait(timeout=retry_at - time.monotonic())
+                    self._wake.clear()
 
         # Final flush on shutdown
         self._flush_remaining()
 
-    def _flush_remaining(self) -> None:
-        """Flush any remaining buffered ticks on shutdown."""
-        with self._buffer_lock:
-            if self._pending_persist_buffer:
-                logger.info(
-                    "Final flush: persisting %d remaining ticks",
-                    len(self._pending_persist_buffer),
-                )
-                try:
-                    self._persistence.persist_ticks(
-                        self._pending_persist_buffer
-                    )
-                    self._pending_persist_buffer = []
-                except Exception as e:
-                    logger.error("Final flush failed: %s", e)
+    def _note_overflow(self, incoming: int) -> int:
+        """Count (and periodically log) ticks the bounded buffer will drop to fit incoming."""
+        overflow = len(self._pending_persist_buffer) + incoming - self._buffer_limit
+        if overflow <= 0:
+            return 0
+        self._ticks_dropped += overflow
+        now = time.monotonic()
+        if now - self._last_drop_log >= DROP_LOG_INTERVAL:
+            self._last_drop_log = now
+            logger.warning(
+                "Persist buffer full (%d ticks); %d ticks dropped so far",
+                self._buffer_limit, self._ticks_dropped,
+            )
+        return overflow
 
-    @staticmethod
-    def _timestamp_to_score(ts_str: str) -> float:
-        """Convert ISO timestamp to Unix float for sorted set scoring."""
-        try:
-            if ts_str:
-                dt = datetime.fromisoformat(ts_str)
-                return dt.timestamp()
-        except (ValueError, TypeError):
-            pass
-        return time.time()
+    def _requeue(self, batch: list) -> None:
+        """Put a failed batch back ahead of newer ticks so the next dump retries it.
 
-    @staticmethod
-    def _extract_date(ts_str: str) -> str:
-        """Extract YYYY-MM-DD from an ISO timestamp."""
-        try:
-            if ts_str:
-                dt = datetime.fromisoformat(ts_str)
-                return dt.strftime("%Y-%m-%d")
-        except (ValueError, TypeError):
-            pass
-        return date.today().isoformat()
+        If it no longer fits, its oldest ticks are dropped (and counted); a plain
+        extendleft would evict the newest instead.
+        """
+        overflow = self._note_overflow(len(batch))
+        self._pending_persist_buffer.extendleft(reversed(batch[overflow:]))
+
+    def _drain_buffer(self) -> list:
+        """Pop everything currently buffered, oldest first."""
+        buffer = self._pending_persist_buffer
+        return [buffer.popleft() for _ in range(len(buffer))]
+
+    def _flush_remaining(self) -> None:
+        """Flush any remaining buffered ticks on shutdown."""
+        batch = self._drain_buffer()
+        if batch:
+            logger.info("Final flush: persisting %d remaining ticks", len(batch))
+            try:
+                self._persistence.persist_ticks(batch)
+            except Exception as e:
+                logger.error("Final flush failed: %s", e)
+                self._requeue(batch)
 
     @staticmethod
-    def _get_best_bid(tick: dict) -> float:
+    def _get_best_bid(tick: Tick) -> float:
         """Extract best bid price from depth data."""
-        depth = tick.get("depth", {})
-        buy_levels = depth.get("buy", [])
-        if buy_levels:
-            return buy_levels[0].get("price", 0)
-        return 0
+        return tick.depth.buy[0].price if tick.depth and tick.depth.buy else 0
 
     @staticmethod
-    def _get_best_ask(tick: dict) -> float:
+    def _get_best_ask(tick: Tick) -> float:
         """Extract best ask price from depth data."""
-        depth = tick.get("depth", {})
-        sell_levels = depth.get("sell", [])
-        if sell_levels:
-            return sell_levels[0].get("price", 0)
-        return 0
+        return tick.depth.sell[0].price if tick.depth and tick.depth.sell else 0
+
+    def request_stop(self) -> None:
+        """Ask the consume loop to exit (signal-safe); call stop() afterwards to clean up."""
+        self._running = False
 
     def stop(self) -> None:
         """Gracefully stop the receiver."""
         logger.info("Stopping receiver...")
         self._running = False
+        self._wake.set()
 
-        # Wait for persistence thread to finish
+        # Wait for persistence thread to finish. The buffer and the SQLite connection
+        # have a single consumer, so nothing below may run while it is still alive.
         if self._persist_thread and self._persist_thread.is_alive():
             self._persist_thread.join(timeout=10)
+            if self._persist_thread.is_alive():
+                logger.warning("Persistence thread still writing; waiting for it to finish")
+                self._persist_thread.join()
 
-        # Final flush
+        # Final flush (the thread's own flush already ran if it was started)
         self._flush_remaining()
 
         # Close persistence
@@ -373,11 +510,9 @@ class TickReceiver:
 
     def get_stats(self) -> dict:
         """Return current receiver statistics."""
-        with self._buffer_lock:
-            buffer_size = len(self._pending_persist_buffer)
-
         return {
             "ticks_processed": self._ticks_processed,
-            "buffer_pending": buffer_size,
+            "buffer_pending": len(self._pending_persist_buffer),
+            "ticks_dropped": self._ticks_dropped,
             "running": self._running,
         }
@@ -2,15 +2,21 @@
 Redis stream publisher. Pushes tick data to a Redis stream (non-blocking).
 """
 
-import json
 import logging
-from datetime import datetime
+import os
 from typing import Optional
 
+import msgspec
 import redis
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_UNIX_SOCKET = "/tmp/redis.sock"
+
+# KiteTicker datetimes are naive, which msgspec writes as ISO-8601 strings: the same
+# values the receiver has always parsed.
+_encoder = msgspec.msgpack.Encoder()
+
 
 class RedisPublisher:
     """Publishes tick data to a Redis stream."""
@@ -22,14 +28,28 @@ class RedisPublisher:
         self.password = config.get("password", None)
         self.stream_name = config.get("stream_name", "ticks:raw")
         self.max_stream_length = config.get("max_stream_length", 100000)
+        self.unix_socket_path = config.get("unix_socket_path", None)
         self._client: Optional[redis.Redis] = None
 
+    def _socket_path(self) -> Optional[str]:
+        """Unix socket to use instead of TCP: configured path, or the default one for a local Redis."""
+        if self.unix_socket_path:
+            return self.unix_socket_path
+        if self.host in ("localhost", "127.0.0.1") and os.path.exists(DEFAULT_UNIX_SOCKET):
+            return DEFAULT_UNIX_SOCKET
+        return None
+
     def connect(self) -> None:
         """Establish connection to Redis."""
-        logger.info("Connecting to Redis at %s:%d/%d", self.host, self.port, self.db)
+        socket_path = self._socket_path()
+        if socket_path:
+            logger.info("Connecting to Redis at unix://%s/%d", socket_path, self.db)
+        else:
+            logger.info("Connecting to Redis at %s:%d/%d", self.host, self.port, self.db)
         self._client = redis.Redis(
             host=self.host,
             port=self.port,
+            unix_socket_path=socket_path,
             db=self.db,
             password=self.password,
             decode_responses=False,
@@ -45,27 +65,35 @@ class RedisPublisher:
         if self._client is None:
             logger.error("Redis not connected. Call connect() first.")
             return
+        if not ticks:
+            return
         try:
-            pipe = self._client.pipeline(transaction=False)
-            for tick in ticks:
-                serialized = self._serialize_tick(tick)
-                pipe.xadd(
-                    self.stream_name,
-                    {"data": serialized},
-                    maxlen=self.max_stream_length,
-                    approximate=True,
-                )
-            pipe.execute()
+            payloads = [self._serialize_tick(tick) for tick in ticks]
+            results = self._xadd_all(payloads, nomkstream=True)
+            # NOMKSTREAM returns nil if the stream vanished (e.g. Redis restarted without
+            # persistence); resend those ticks letting XADD recreate it.
+            missing = [p for p, entry_id in zip(payloads, results) if entry_id is None]
+            if missing:
+                logger.warning("Stream '%s' missing, recreating with %d ticks", self.stream_name, len(missing))
+                self._xadd_all(missing, nomkstream=False)
         except redis.RedisError as e:
             logger.error("Failed to publish ticks: %s", e)
 
+    def _xadd_all(self, payloads: list, nomkstream: bool) -> list:
+        pipe = self._client.pipeline(transaction=False)
+        for payload in payloads:
+            pipe.xadd(
+                self.stream_name,
+                {b"m": payload},
+                maxlen=self.max_stream_length,
+                approximate=True,
+                nomkstream=nomkstream,
+            )
+        return pipe.execute()
+
     @staticmethod
     def _serialize_tick(tick: dict) -> bytes:
-        def _default(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
-        return json.dumps(tick, default=_default).encode("utf-8")
+        return _encoder.encode(tick)
 
     def ensure_consumer_group(self, group_name: str) -> None:
         try: